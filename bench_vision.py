@@ -0,0 +1,184 @@
+"""
+File Name: bench_vision.py
+
+Title: Offline vision benchmark
+
+Purpose: Measures the find_object() detection pipeline on recorded frames, without the car.
+Every hsv profile is run in every detection mode over the whole corpus, and the per-frame
+latency percentiles, frames per second, detection hit rate and how many of the detections
+had a depth reading at their center are printed for each. With
+more than one profile, vision.ColorDetector then finds all of them in a single pass (one hsv
+conversion per frame) as the 'detector' row, to compare against the sum of the 'full' rows.
+
+Usage:
+    python3 bench_vision.py <corpus> [--profiles candle deer] [--modes roi moments] [--repeat 3]
+
+A corpus is one of:
+- a directory of .png/.jpg color frames, each with an optional <name>_depth.npy or
+  <name>_depth.png depth frame next to it
+- a directory of .npz files, each holding a 'color' array and optionally a 'depth' array
+- a single .npz archive holding a 'color' array of shape (N, H, W, 3) and optionally 'depth'
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import argparse
+import glob
+import os
+import sys
+from time import perf_counter
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(0, '../library')
+import vision
+
+########################################################################################
+# Global variables
+########################################################################################
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+PERCENTILES = (50, 95, 99)
+
+########################################################################################
+# Corpus loading
+########################################################################################
+
+# loads the depth frame stored next to a color frame, or None if there is none
+def load_depth(stem):
+    if os.path.exists(stem + '_depth.npy'):
+        return np.load(stem + '_depth.npy')
+    if os.path.exists(stem + '_depth.png'):
+        return cv.imread(stem + '_depth.png', cv.IMREAD_UNCHANGED)
+    return None
+# END DEF
+
+# returns a list of (color, depth) frames, depth is None when the corpus has no depth
+def load_corpus(path):
+    frames = []
+
+    if os.path.isfile(path):
+        archive = np.load(path)
+        depths = archive['depth'] if 'depth' in archive.files else None
+        for index, color in enumerate(archive['color']):
+            frames.append((color, None if depths is None else depths[index]))
+        return frames
+
+    for file in sorted(glob.glob(os.path.join(path, '*'))):
+        stem, extension = os.path.splitext(file)
+
+        if extension == '.npz':
+            archive = np.load(file)
+            depth = archive['depth'] if 'depth' in archive.files else None
+            frames.append((archive['color'], depth))
+        elif extension.lower() in IMAGE_EXTENSIONS and not stem.endswith('_depth'):
+            frames.append((cv.imread(file, cv.IMREAD_COLOR), load_depth(stem)))
+
+    return frames
+# END DEF
+
+########################################################################################
+# Benchmark
+########################################################################################
+
+# runs the detection pipeline of find_object() over every frame, repeat times
+# returns (per-frame latencies in seconds, number of frames with a detection, number of those
+# detections with a nonzero depth at the center)
+def run_pipeline(frames, hsvMin, hsvMax, mode, repeat=1):
+    latencies = np.empty(len(frames) * repeat, dtype=np.float64)
+    hits = 0
+    depthHits = 0
+
+    for run in range(repeat):
+        # a fresh tracker per run, like pressing start on the car
+        tracker = vision.RoiTracker()
+
+        for index, (color, depth) in enumerate(frames):
+            started = perf_counter()
+
+            contour, center = vision.find_target(color, hsvMin, hsvMax, mode, tracker)
+
+            # navigation.py reads the distance from the depth frame at the center
+            distance = 0
+            if center is not None and depth is not None:
+                distance = depth[min(center[0], depth.shape[0] - 1), min(center[1], depth.shape[1] - 1)]
+
+            latencies[run * len(frames) + index] = perf_counter() - started
+
+            if center is not None and run == 0:
+                hits += 1
+                if distance > 0:
+                    depthHits += 1
+
+    return latencies, hits, depthHits
+# END DEF
+
+# runs vision.ColorDetector for all the given profiles over every frame, repeat times
+# returns (per-frame latencies in seconds, number of frames where any profile was found)
+def run_detector(frames, profiles, repeat=1):
+    detector = vision.ColorDetector({name: vision.HSV_PROFILES[name] for name in profiles})
+    latencies = np.empty(len(frames) * repeat, dtype=np.float64)
+    hits = 0
+
+    for run in range(repeat):
+        for index, (color, depth) in enumerate(frames):
+            started = perf_counter()
+            results = detector.detect(color)
+            latencies[run * len(frames) + index] = perf_counter() - started
+
+            if run == 0 and any(center is not None for contour, center in results.values()):
+                hits += 1
+
+    return latencies, hits
+# END DEF
+
+# prints one row of the results table, depthHits is None when the row reads no depth
+def report(profile, mode, latencies, hits, frameCount, depthHits=None):
+    p50, p95, p99 = np.percentile(latencies, PERCENTILES) * 1000
+    fps = len(latencies) / latencies.sum() if latencies.sum() > 0 else float('inf')
+    hitRate = hits / frameCount * 100
+
+    # share of the detections that got a distance from the depth frame
+    if depthHits is None:
+        depthRate = '-'
+    else:
+        depthRate = f'{depthHits / hits * 100 if hits else 0.0:.1f}%'
+
+    print(f'{profile:<10} {mode:<11} {p50:8.2f} {p95:8.2f} {p99:8.2f} {fps:9.1f} {hitRate:7.1f}% {depthRate:>8}')
+# END DEF
+
+def main():
+    parser = argparse.ArgumentParser(description='benchmark find_object() on recorded frames')
+    parser.add_argument('corpus', help='directory of frames or a .npz archive')
+    parser.add_argument('--profiles', nargs='+', default=list(vision.HSV_PROFILES), choices=list(vision.HSV_PROFILES))
+    parser.add_argument('--modes', nargs='+', default=list(vision.DETECTION_MODES), choices=list(vision.DETECTION_MODES))
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the corpus per profile and mode')
+    args = parser.parse_args()
+
+    frames = load_corpus(args.corpus)
+    if not frames:
+        print(f'no frames found in {args.corpus}')
+        return 1
+
+    height, width = frames[0][0].shape[:2]
+    print(f'{len(frames)} frames of {width}x{height}, {args.repeat} passes each')
+    print(f'{"profile":<10} {"mode":<11} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"fps":>9} {"hits":>8} {"depth":>8}')
+
+    for profile in args.profiles:
+        hsvMin, hsvMax = vision.HSV_PROFILES[profile]
+        for mode in args.modes:
+            latencies, hits, depthHits = run_pipeline(frames, hsvMin, hsvMax, mode, args.repeat)
+            report(profile, mode, latencies, hits, len(frames), depthHits)
+
+    if len(args.profiles) > 1:
+        latencies, hits = run_detector(frames, args.profiles, args.repeat)
+        report('all', 'detector', latencies, hits, len(frames))
+
+    return 0
+# END DEF
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+File Name: camera.py
+
+Title: USB camera helpers
+
+Purpose: Keeps the USB camera off the update() path. The camera is found once from
+/dev/video* and remembered for the next launch, and a worker thread grabs frames as fast as
+the camera delivers them, so update() just takes the newest one without waiting on the
+camera's frame interval.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import glob
+import json
+import os
+import re
+import threading
+from time import monotonic, sleep
+import cv2 as cv
+import numpy as np
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# remembers the last working camera so the next launch can open it straight away
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.camera_cache.json')
+
+# how long (seconds) a device gets to open and deliver its first frame
+PROBE_TIMEOUT = 1.0
+
+# what we ask the driver for, it may grant something different (see configure_capture)
+# a buffer size of 1 means the driver never hands us a frame that has been sitting in a queue
+CAPTURE_SETTINGS = {
+    'width': 640,
+    'height': 480,
+    'fps': 60,
+    'format': 'MJPG',
+    'buffer_size': 1,
+}
+
+########################################################################################
+# Camera discovery
+########################################################################################
+
+# returns the indices of the /dev/videoN devices that exist, lowest first
+def list_video_indices():
+    indices = []
+    for path in glob.glob('/dev/video*'):
+        match = re.fullmatch(r'/dev/video(\d+)', path)
+        if match:
+            indices.append(int(match.group(1)))
+    return sorted(indices)
+# END DEF
+
+# opens a device, applies the requested settings and checks that it actually delivers a frame
+# some nodes (metadata, codecs) hang on read, so the check runs on a thread with a timeout
+# returns the open capture, or None if the device did not work in time
+def probe_camera(index, timeout=PROBE_TIMEOUT, settings=None):
+    lock = threading.Lock()
+    result = {'capture': None, 'abandoned': False}
+
+    def probe():
+        capture = cv.VideoCapture(index, cv.CAP_V4L2)
+        ok = capture.isOpened()
+
+        # the format has to be set before streaming starts, so configure before the first read
+        if ok and settings is not None:
+            configure_capture(capture, settings)
+        ok = ok and capture.read()[0]
+
+        with lock:
+            if ok and not result['abandoned']:
+                result['capture'] = capture
+                return
+        capture.release()
+    # END DEF
+
+    thread = threading.Thread(target=probe, name=f'probe-video{index}', daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    # if the probe finishes after the timeout it releases the device itself
+    with lock:
+        result['abandoned'] = True
+        return result['capture']
+# END DEF
+
+# reads the cached camera index, the settings that were requested and the settings the driver
+# granted for them, or None if there is no usable cache
+def load_camera_cache(cacheFile=CACHE_FILE):
+    try:
+        with open(cacheFile) as file:
+            cache = json.load(file)
+        return int(cache['index']), cache.get('requested'), cache.get('settings', {})
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+# END DEF
+
+def save_camera_cache(index, requested, granted, cacheFile=CACHE_FILE):
+    try:
+        with open(cacheFile, 'w') as file:
+            json.dump({'index': index, 'requested': requested, 'settings': granted}, file)
+    except OSError as error:
+        print(f'could not write camera cache: {error}')
+# END DEF
+
+# the settings the driver is currently running the capture with
+def read_capture_settings(capture):
+    # the pixel format comes back as a packed four character code
+    fourcc = int(capture.get(cv.CAP_PROP_FOURCC))
+    pixelFormat = ''.join(chr((fourcc >> (8 * k)) & 0xFF) for k in range(4))
+
+    return {
+        'width': int(capture.get(cv.CAP_PROP_FRAME_WIDTH)),
+        'height': int(capture.get(cv.CAP_PROP_FRAME_HEIGHT)),
+        'fps': capture.get(cv.CAP_PROP_FPS),
+        'format': pixelFormat,
+        'buffer_size': int(capture.get(cv.CAP_PROP_BUFFERSIZE)),
+    }
+# END DEF
+
+# asks the driver for a resolution, frame rate, pixel format and buffer size
+# returns what the driver actually granted, which is what the rest of the code has to use
+def configure_capture(capture, settings=CAPTURE_SETTINGS):
+    # v4l2 picks the available sizes and rates based on the format, so the format goes first
+    if 'format' in settings:
+        capture.set(cv.CAP_PROP_FOURCC, cv.VideoWriter_fourcc(*settings['format']))
+    if 'width' in settings:
+        capture.set(cv.CAP_PROP_FRAME_WIDTH, settings['width'])
+    if 'height' in settings:
+        capture.set(cv.CAP_PROP_FRAME_HEIGHT, settings['height'])
+    if 'fps' in settings:
+        capture.set(cv.CAP_PROP_FPS, settings['fps'])
+    if 'buffer_size' in settings:
+        capture.set(cv.CAP_PROP_BUFFERSIZE, settings['buffer_size'])
+
+    granted = read_capture_settings(capture)
+
+    for key, value in settings.items():
+        if granted.get(key) != value:
+            print(f"camera {key}: requested {value}, got {granted.get(key)}")
+
+    return granted
+# END DEF
+
+# finds a working camera, trying the cached one first and then every /dev/videoN in order
+# returns (capture, index, granted settings), or (None, None, None) if no camera works
+def discover_camera(cacheFile=CACHE_FILE, timeout=PROBE_TIMEOUT, settings=CAPTURE_SETTINGS):
+    candidates = list_video_indices()
+
+    cachedIndex = None
+    cache = load_camera_cache(cacheFile)
+    if cache is not None and cache[0] in candidates:
+        cachedIndex, cachedRequest, cachedGrant = cache
+        candidates.remove(cachedIndex)
+        candidates.insert(0, cachedIndex)
+
+    for index in candidates:
+        # the cached camera is asked straight away for what its driver granted last time, as
+        # long as the same settings are requested, so it does not negotiate them all over again
+        probeSettings = settings
+        if index == cachedIndex and cachedRequest == settings and cachedGrant:
+            probeSettings = cachedGrant
+
+        capture = probe_camera(index, timeout, probeSettings)
+        if capture is None:
+            print(f"not found at position: {index}")
+            continue
+
+        print(f"found at position: {index}")
+        granted = read_capture_settings(capture)
+        save_camera_cache(index, settings, granted, cacheFile)
+        return capture, index, granted
+
+    return None, None, None
+# END DEF
+
+########################################################################################
+# Background capture
+########################################################################################
+
+# continuously reads frames from a cv.VideoCapture into a small set of preallocated buffers
+# with three buffers the worker always has a free one to write into: one holds the newest
+# frame, one may be in use by the reader, and the third is being filled
+# with fewer the newest frame and the reader's frame can take every buffer, so three is the least
+class CaptureWorker:
+    def __init__(self, capture, buffers=3):
+        if buffers < 3:
+            raise ValueError(f'CaptureWorker needs at least 3 buffers, got {buffers}')
+
+        self.capture = capture
+        self.buffers = buffers
+
+        # frames and their metadata, filled in by the worker thread
+        self.frames = [None] * buffers
+        self.stamps = np.zeros(buffers, dtype=np.float64)
+        self.seqs = np.zeros(buffers, dtype=np.int64)
+
+        # index of the newest complete frame, and of the frame the reader currently holds
+        self.latest = None
+        self.reading = None
+
+        # number of frames captured so far, used as the sequence number
+        self.seq = 0
+        self.failures = 0
+
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+    # END DEF
+
+    # starts the worker thread, the first frame is used to size the buffers
+    def start(self):
+        if self.running:
+            return
+
+        ok, frame = self.capture.read()
+        if ok:
+            for slot in range(self.buffers):
+                self.frames[slot] = np.empty_like(frame)
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='capture-worker', daemon=True)
+        self.thread.start()
+    # END DEF
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+    # END DEF
+
+    # picks a buffer that is neither the newest frame nor held by the reader
+    def free_slot(self):
+        with self.lock:
+            for slot in range(self.buffers):
+                if slot != self.latest and slot != self.reading:
+                    return slot
+        return None
+    # END DEF
+
+    def run(self):
+        while self.running:
+            slot = self.free_slot()
+
+            # read() writes straight into the buffer when the shape matches, so nothing is allocated
+            ok, frame = self.capture.read(self.frames[slot])
+            stamp = monotonic()
+
+            if not ok:
+                self.failures += 1
+                sleep(0.005)
+                continue
+
+            # only publish the frame once it is completely written
+            with self.lock:
+                self.seq += 1
+                self.frames[slot] = frame
+                self.stamps[slot] = stamp
+                self.seqs[slot] = self.seq
+                self.latest = slot
+    # END DEF
+
+    # returns (ok, frame, timestamp, sequence number) for the newest frame without blocking
+    # the frame stays valid until the next call, timestamps come from time.monotonic()
+    def read_latest(self):
+        with self.lock:
+            if self.latest is None:
+                return False, None, 0.0, 0
+
+            self.reading = self.latest
+            return True, self.frames[self.reading], self.stamps[self.reading], int(self.seqs[self.reading])
+    # END DEF
@@ -0,0 +1,87 @@
+"""
+File Name: camera_model.py
+
+Title: Camera model
+
+Purpose: Turns image positions into angles. The tables are built once from the resolution
+and the horizontal fov (a pinhole camera with square pixels), so steering can work in
+degrees instead of pixels and the same gains hold at any resolution. A lookup is one index
+into a precomputed array.
+
+    cameraModel = camera_model.CameraModel(640, 480)
+    xErr = cameraModel.bearing(centroidX)
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import math
+import numpy as np
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# screen - 480, 640 (y,x), with a 110 degree fov across the width
+IMAGE_WIDTH = 640
+IMAGE_HEIGHT = 480
+FOV = 110
+
+########################################################################################
+# Camera model
+########################################################################################
+
+class CameraModel:
+    def __init__(self, width=IMAGE_WIDTH, height=IMAGE_HEIGHT, fov=FOV):
+        self.width = width
+        self.height = height
+        self.fov = fov
+
+        # focal length in pixels, about 224 at 640 wide
+        self.focalLength = (width / 2) / math.tan(math.radians(fov) / 2)
+        # the optical center, between the two middle pixels
+        self.centerX = (width - 1) / 2
+        self.centerY = (height - 1) / 2
+
+        # pixels per degree at the center of the image, for converting pixel gains to degrees
+        self.pixelsPerDegree = self.focalLength * math.pi / 180
+
+        # bearing of every column in degrees, positive to the right of center
+        self.bearings = np.degrees(np.arctan2(np.arange(width) - self.centerX, self.focalLength))
+        # elevation of every row in degrees, positive below center
+        self.elevations = np.degrees(np.arctan2(np.arange(height) - self.centerY, self.focalLength))
+
+        # per pixel rays, only built if rays() is used
+        self.rayTable = None
+    # END DEF
+
+    # bearing (degrees) of an image column, positive to the right
+    def bearing(self, column):
+        return float(self.bearings[min(max(int(column), 0), self.width - 1)])
+    # END DEF
+
+    # elevation (degrees) of an image row, positive downward
+    def elevation(self, row):
+        return float(self.elevations[min(max(int(row), 0), self.height - 1)])
+    # END DEF
+
+    # the (possibly fractional) column a bearing in degrees lands on
+    def column(self, bearing):
+        return self.centerX + self.focalLength * math.tan(math.radians(bearing))
+    # END DEF
+
+    # unit vector through every pixel, shape (height, width, 3) as (right, down, forward)
+    def rays(self):
+        if self.rayTable is None:
+            x = (np.arange(self.width, dtype=np.float32) - self.centerX) / self.focalLength
+            y = (np.arange(self.height, dtype=np.float32) - self.centerY) / self.focalLength
+
+            rays = np.empty((self.height, self.width, 3), dtype=np.float32)
+            rays[:, :, 0] = x[None, :]
+            rays[:, :, 1] = y[:, None]
+            rays[:, :, 2] = 1
+            rays /= np.linalg.norm(rays, axis=2, keepdims=True)
+            self.rayTable = rays
+        return self.rayTable
+    # END DEF
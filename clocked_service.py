@@ -0,0 +1,82 @@
+"""
+File Name: clocked_service.py
+
+Title: Clocked background services
+
+Purpose: The shared base of the services that run on their own thread at a fixed rate (the
+control loop, the frame watchdog, the led display and the elevator motion). Each one reads
+the time from an injectable clock, monotonic() by default, and does one round of its work in
+step(now). On the car start() runs a thread that calls step(). After use_clock() no thread
+is started, and whoever owns the new clock calls step(now) instead, like the headless
+racecar does on its virtual frame clock, so a run plays out the same way every time.
+
+    class Blinker(clocked_service.ClockedService):
+        threadName = 'blinker'
+
+        def step(self, now=None):
+            ...
+
+        def run(self):
+            while self.running:
+                self.step()
+                sleep(0.1)
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import threading
+from time import monotonic
+
+########################################################################################
+# Clocked service
+########################################################################################
+
+# subclasses call init_clock() from __init__ and implement step(now) and run()
+class ClockedService:
+    # name of the thread start() runs
+    threadName = 'service'
+
+    def init_clock(self, clock=monotonic):
+        # returns the current time in seconds, monotonic() unless use_clock() replaced it
+        self.clock = clock
+        # stepped from outside instead of running its own thread
+        self.manual = False
+
+        self.running = False
+        self.thread = None
+    # END DEF
+
+    # runs on the given clock from now on, stepped by its owner instead of a thread
+    # subclasses that keep times from the old clock override this to restart them
+    def use_clock(self, clock):
+        self.stop()
+        self.clock = clock
+        self.manual = True
+    # END DEF
+
+    def start(self):
+        if self.running or self.manual:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=self.threadName, daemon=True)
+        self.thread.start()
+    # END DEF
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+    # END DEF
+
+    # one round of work as of time now, from the clock if not given
+    def step(self, now=None):
+        raise NotImplementedError
+    # END DEF
+
+    # the thread body, calls step() at the service's rate while running
+    def run(self):
+        raise NotImplementedError
+    # END DEF
@@ -0,0 +1,141 @@
+"""
+File Name: control_loop.py
+
+Title: Fixed rate control loop
+
+Purpose: Runs the drive control at a fixed rate on its own thread, decoupled from update().
+Vision publishes its newest measurement whenever a frame is processed, and the control loop
+always acts on the most recent one together with how old it is. A slow detection frame no
+longer freezes the drive output, and the loop reports how well it keeps its own schedule.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import threading
+from time import monotonic, sleep
+
+from clocked_service import ClockedService
+
+########################################################################################
+# Control scheduler
+########################################################################################
+
+# calls control(measurement, age, dt, fresh) rate times per second
+# - measurement is the tuple last given to publish(), or None if nothing was published yet
+# - age is how many seconds ago it was published
+# - dt is the time since the previous control call
+# - fresh is whether the measurement was published since the previous control call, the loop
+#   runs faster than vision, so most calls see the same measurement again
+# a tick that finishes after the next one should have started counts as a deadline miss, and
+# the schedule restarts from there instead of running the missed ticks back to back
+class ControlScheduler(ClockedService):
+    threadName = 'control-loop'
+
+    def __init__(self, control, rate=100.0, clock=monotonic):
+        self.control = control
+        self.period = 1.0 / rate
+
+        self.init_clock(clock)
+        # when the next tick is due and when the last one ran, for step()
+        self.deadline = None
+        self.lastTick = None
+
+        self.lock = threading.Lock()
+        self.measurement = None
+        self.stamp = 0.0
+        # how many measurements were published, and how many of them the last tick had seen
+        self.sequence = 0
+        self.seenSequence = 0
+
+        self.reset_stats()
+    # END DEF
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.misses = 0
+        # how late each tick started compared to its schedule, in seconds
+        self.jitterTotal = 0.0
+        self.jitterMax = 0.0
+    # END DEF
+
+    # hands a new measurement to the control loop, safe to call from update()
+    def publish(self, *measurement):
+        with self.lock:
+            self.measurement = measurement
+            self.stamp = self.clock()
+            self.sequence += 1
+    # END DEF
+
+    # returns (measurement, age in seconds, sequence number), or (None, 0, 0) if nothing was
+    # published yet
+    def latest(self):
+        with self.lock:
+            if self.measurement is None:
+                return None, 0.0, 0
+            return self.measurement, self.clock() - self.stamp, self.sequence
+    # END DEF
+
+    def use_clock(self, clock):
+        super().use_clock(clock)
+        self.deadline = None
+    # END DEF
+
+    # one control call at time now for the tick that was due at deadline
+    def tick(self, now, deadline, lastTick):
+        jitter = now - deadline
+        self.jitterTotal += jitter
+        self.jitterMax = max(self.jitterMax, jitter)
+        self.ticks += 1
+
+        measurement, age, sequence = self.latest()
+        fresh = sequence != self.seenSequence
+        self.seenSequence = sequence
+        self.control(measurement, age, now - lastTick, fresh)
+    # END DEF
+
+    def run(self):
+        deadline = self.clock()
+        lastTick = deadline
+
+        while self.running:
+            deadline += self.period
+
+            # sleep until the tick is due
+            wait = deadline - self.clock()
+            if wait > 0:
+                sleep(wait)
+
+            now = self.clock()
+            self.tick(now, deadline, lastTick)
+            lastTick = now
+
+            # ran past the next tick, so skip ahead instead of catching up in a burst
+            finished = self.clock()
+            if finished > deadline + self.period:
+                self.misses += 1
+                deadline = finished
+    # END DEF
+
+    # runs every tick that is due by now, for a loop driven from outside
+    def step(self, now=None):
+        if now is None:
+            now = self.clock()
+
+        if self.deadline is None:
+            self.deadline = now
+            self.lastTick = now
+
+        while self.deadline + self.period <= now:
+            self.deadline += self.period
+            self.tick(self.deadline, self.deadline, self.lastTick)
+            self.lastTick = self.deadline
+    # END DEF
+
+    # a one line summary of the loop timing, for update_slow()
+    def summary(self):
+        meanJitter = self.jitterTotal / self.ticks if self.ticks else 0.0
+        return (f'control loop: {self.ticks} ticks, {self.misses} deadline misses, '
+                f'jitter mean {meanJitter * 1000:.2f} ms max {self.jitterMax * 1000:.2f} ms')
+    # END DEF
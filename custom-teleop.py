@@ -30,19 +30,34 @@ Expected Outcome: Terminal output and RACECAR movement occurs when buttons are p
 
 import sys
 from time import time
-from gpiozero import DigitalInputDevice
 from gpiozero import Servo
-import numpy as np
 
 sys.path.insert(0, '../library')
 import racecar_core
 import racecar_utils as rc_utils
+import vision
+import pid
+import control_loop
+import filters
+import telemetry
+import timing
+import watchdog
+import lidar_range
+import camera_model
+import led_display
+import flame_sensor
+import servo_output
+import motion_profile
 
 ########################################################################################
 # Global variables
 ########################################################################################
 
 rc = racecar_core.create_racecar()
+
+# turns image columns into bearings, the x error is measured in degrees from the center
+# so the gains do not depend on the camera resolution (see camera_model.py)
+cameraModel = camera_model.CameraModel(rc.camera.get_width(), rc.camera.get_height())
 # drive and manipulator speeds
 speed = 0.5
 diff_speed = 0.5
@@ -51,24 +66,94 @@ diff_speed = 0.5
 auton = False
 
 # PID things
-lastXErr = 0
-lastYErr = 0
-avgX = 0
-avgY = 0
-lowPassThreshold = 0.8
-xIntegral = 0
+# one controller per axis, x steers onto the object and y closes to 50 cm from it
+# older x tuning (in pixels): kp 1, ki 0.05, kd 0.6
+# the x gains are the old pixel gains (kp 1, ki 0.01, kd 0.1) times the 3.91 px per degree of
+# the 640 wide camera
+# the x output is scaled and clamped by move_to_position() itself, so it has no output limit
+xPid = pid.PID(kp=3.91, ki=0.039, kd=0.391, outputLimits=None)
+yPid = pid.PID(kp=1, kd=0.6, setpoint=50)
+
+# degrees from the object at which the robot starts closing the distance (50 px at 640 wide)
+alignThreshold = 12.5
+
+# which stage of the navigation is running, 'align' or 'close'
+navStage = None
+
+# drive control runs at a fixed rate on its own thread and uses the newest vision measurement
+# (see control_loop.py and control_step())
+controlRate = 100
+# measurements older than this (seconds) are not steered on
+maxMeasurementAge = 0.5
+
+# tracks the (xErr, dist) of the object with a constant velocity kalman filter, so a frame
+# that misses the candle is predicted through instead of stopping the rover
+# noise is (degrees, cm) for the detections and (degrees/s^2, cm/s^2) for how the object moves in view
+targetFilter = filters.KalmanTracker(processNoise=(75, 100), measurementNoise=(1, 5), coastTime=0.4, channels=2)
+# smooths the (x, y) drive outputs, same weight on the newest output as the old low_pass()
+outputFilter = filters.EmaFilter(alpha=0.2, channels=2)
+
+# the last (xOutput, yOutput) sent to the drive, xOutput is the negated turn angle
+driveOutput = (0, 0)
+
+# logs every update() tick to telemetry/ instead of printing (see telemetry.py)
+recorder = telemetry.TelemetryRecorder('custom-teleop')
+
+# distance to the object from the lidar samples around its column (see lidar_range.py)
+rangeFinder = lidar_range.LidarRange(cameraModel)
+# used when no lidar sample around the object returned
+fallbackDistance = 100
+
+# only searches around the last detection instead of the whole frame (see vision.py)
+tracker = vision.RoiTracker()
+
+# how find_object() searches the frame, one of vision.DETECTION_MODES
+# the watchdog switches to the cheaper degraded mode while update() is over its budget
+detectionMode = 'roi'
+preferredDetectionMode = 'roi'
+degradedDetectionMode = 'downscaled'
+
+# whether find_object() draws the contour onto the image, dropped while degraded
+debugDraw = True
+
+# watches the update() time and the age of the last detection, stops the drive when either
+# gets out of hand (see watchdog.py)
+frameWatchdog = watchdog.FrameWatchdog(onFailsafe=rc.drive.stop)
+
+# the object to drive to, one of the profiles in vision.HSV_PROFILES
+targetProfile = 'candle'
 
 # creates references to the external devices connected to the raspberry pi (only if it can, otherwise null ref)
 
-flame_ref = DigitalInputDevice(5)
+# the flame sensor reports changes as they happen instead of being polled (see flame_sensor.py)
+flameSensor = flame_sensor.FlameSensor(5)
 servo_l = Servo(6)
 servo_r = Servo(13)
-
-# backend positions for the servos for more precise movements 
-servo_l_pos = 0
-servo_r_pos = 0
+# the fan servo is added later when the mechanism is confirmed, until then its positions go nowhere
+servo_fan = None
+
+# collects the servo positions of an update() and writes each servo at most once, only when
+# it moved (see servo_output.py)
+servoOutput = servo_output.ServoOutput()
+servoOutput.add('fan', servo_fan)
+
+# the elevator servos are driven by their own thread along smooth motion profiles toward the
+# extension and rotation setpoints (see motion_profile.py), with their own output stage
+elevatorOutput = servo_output.ServoOutput()
+elevatorOutput.add('left', servo_l)
+elevatorOutput.add('right', servo_r)
+elevatorMotion = motion_profile.ElevatorMotion(elevatorOutput, rotationVelocity=diff_speed)
+
+# backend position for the fan servo
 servo_fan_pos = 0
 
+# which way the triggers are rotating the elevator, 1, -1 or 0
+rotate_direction = 0
+
+# seconds FIRE stays on the matrix after the sensor last saw the fire, so a flickering
+# flame does not toggle the display every frame
+fireHoldTime = 0.5
+
 # controlling the elevator
 # the amount of trigger force required to move elevator
 trigger_deadzone = 0.5
@@ -76,6 +161,12 @@ trigger_deadzone = 0.5
 # amount to move by per trigger click
 elevator_increment_amount = 0.2
 
+# draws the led matrix on its own thread, update() only says what to show (see led_display.py)
+ledDisplay = led_display.LedDisplay(rc.display)
+
+# bearing of the tracked object in degrees for the status display, None without one
+targetBearing = None
+
 '''
 
 
@@ -88,23 +179,40 @@ def start():
     speed = 0.5
     diff_speed = 0.5
     auton = False
-    lastXErr = 0
-    lastDist = 0
-
-    avgX = 0
-    avgY = 0
-    lowPassThreshold = 0.8
-    
-    xIntegral = 0
 
-    servo_l_pos = 0
-    servo_r_pos = 0
+    # clear the controllers and filters from the last run
+    xPid.reset()
+    yPid.reset()
+    targetFilter.reset()
+    outputFilter.reset()
 
     trigger_deadzone = 0.5
 
     elevator_increment_amount = 0.2
 
+    # start every run with a full frame search
+    tracker.reset()
+
+    # the elevator thread keeps running between runs
+    elevatorMotion.start()
+
+    # the display thread keeps running between runs
+    ledDisplay.start()
+
+    # stop the moment the sensor sees the fire, not at the next update()
+    flameSensor.onFire = stop_for_fire
+
+    # every run starts at the normal level
+    frameWatchdog.reset()
+    frameWatchdog.start()
+
+    # a new telemetry file for every run
+    recorder.start()
+
     rc.drive.stop()
+
+    # the loop keeps running between runs, it only drives while auton is set
+    controlLoop.start()
 # END DEF
 
 '''
@@ -115,65 +223,124 @@ UPDATE ALL SUBSYSTEMS
 
 '''
 
+@timing.timed('update')
 def update():
-    global speed, auton, flame_ref, servo_l, servo_r, trigger_deadzone, elevator_increment_amount
-    
-    # settings normalized speed (0-1)
-    rc.drive.set_max_speed(speed)
+    global speed, auton, flameSensor, trigger_deadzone, elevator_increment_amount, driveOutput, rotate_direction
+    global detectionMode, debugDraw, targetBearing
 
-    # get joystick data
-    joystick_l = rc.controller.get_joystick(rc.controller.Joystick.LEFT)
-    joystick_r = rc.controller.get_joystick(rc.controller.Joystick.RIGHT)
-    
-    # when the controller button is pressed, initialize the autonomous sequence
-    if rc.controller.was_pressed(rc.controller.Button.A):
-        auton = True
-    elif rc.controller.was_pressed(rc.controller.Button.B): #auton manual override
-        auton = False
+    frameWatchdog.begin()
 
-    # servo controls
-    if rc.controller.was_pressed(rc.controller.Button.X):
-        extend_elevator(elevator_increment_amount)
-    elif rc.controller.was_pressed(rc.controller.Button.Y):
-        extend_elevator(-elevator_increment_amount)
+    # drop the optional work while the pi cannot keep up, but not just because the target is out of view
+    degraded = frameWatchdog.overBudget
+    debugDraw = not degraded
+    detectionMode = degradedDetectionMode if degraded else preferredDetectionMode
     
-    # collect trigger input data
-    diff_rotate_control_postive = rc.controller.get_trigger(rc.controller.Trigger.RIGHT)
-    diff_rotate_control_negative = rc.controller.get_trigger(rc.controller.Trigger.LEFT)
+    # settings normalized speed (0-1)
+    rc.drive.set_max_speed(speed)
 
-    # move elevator based on trigger data
-    if (diff_rotate_control_postive > trigger_deadzone):
-        rotate_elevator(1)
-    elif (diff_rotate_control_negative > trigger_deadzone):
-        rotate_elevator(-1)
+    with timing.section('controller'):
+        # get joystick data
+        joystick_l = rc.controller.get_joystick(rc.controller.Joystick.LEFT)
+        joystick_r = rc.controller.get_joystick(rc.controller.Joystick.RIGHT)
+        
+        # when the controller button is pressed, initialize the autonomous sequence
+        if rc.controller.was_pressed(rc.controller.Button.A):
+            if not auton:
+                begin_navigation()
+            auton = True
+        elif rc.controller.was_pressed(rc.controller.Button.B): #auton manual override
+            auton = False
+
+    with timing.section('servos'):
+        # servo controls
+        if rc.controller.was_pressed(rc.controller.Button.X):
+            extend_elevator(elevator_increment_amount)
+        elif rc.controller.was_pressed(rc.controller.Button.Y):
+            extend_elevator(-elevator_increment_amount)
+        
+        # collect trigger input data
+        diff_rotate_control_postive = rc.controller.get_trigger(rc.controller.Trigger.RIGHT)
+        diff_rotate_control_negative = rc.controller.get_trigger(rc.controller.Trigger.LEFT)
+
+        # move elevator based on trigger data, the elevator thread keeps rotating until the trigger is released
+        if (diff_rotate_control_postive > trigger_deadzone):
+            direction = 1
+        elif (diff_rotate_control_negative > trigger_deadzone):
+            direction = -1
+        else:
+            direction = 0
+
+        if direction != rotate_direction:
+            rotate_elevator(direction)
+            rotate_direction = direction
+
+        # one write per servo for this tick, whatever the buttons and triggers asked for
+        set_servo_pos()
+        servoOutput.flush()
 
     # turn the fan on and off with a servo
     # if right bumper pressed, turn on fan
     # if left bumper pressed, turn off fan
     # add this later when mechanism is confirmed
 
-    # detecing and displaying fires - monitor station
-    if (flame_ref.value == 0):
-        write_fire()
-    else:
-        no_detection_matrix()
-
-    # autonomous move
-    if (auton):
-        xErr, dist = find_object()
-        # dist is currently a constant value to ensure that it only moves when it detects a fire
-        move_to_position(xErr,dist)
-    else: # teleoperated move
-        # speed controls, allowing the speed to be staged up and down between 0% and 100%
-        if rc.controller.was_pressed(rc.controller.Button.LB):
-            if (speed + 0.1 >= 0.1):
-                speed -= 0.1
-        elif rc.controller.was_pressed(rc.controller.Button.RB):
-            if (speed + 0.1 <= 1):
-                speed += 0.1
-        
-        # set the speed to tthe joystick inputs
-        rc.drive.set_speed_angle(joystick_l[1], joystick_r[0])
+    with timing.section('flame_led'):
+        # detecing and displaying fires - monitor station
+        # the sensor stops the navigation the moment a fire starts (stop_for_fire), and while
+        # the fire is still there navigating does not start again
+        flame = flameSensor.value
+        if flameSensor.fire:
+            auton = False
+
+        # show() only hands the message to the display thread, so this stays on even while degraded
+        if flameSensor.fire_within(fireHoldTime):
+            write_fire()
+        else:
+            no_detection_matrix()
+
+    # no detection unless navigating
+    xErr, dist = 0, 0
+
+    with timing.section('navigation'):
+        # autonomous move
+        if (auton):
+            xErr, dist = find_object()
+
+            # a dist of 0 means no detection, then the position is predicted from the last ones
+            # until the object has been gone for coastTime, after which dist 0 stops the drive
+            if dist != 0:
+                frameWatchdog.measured()
+                xErr, dist = targetFilter.update((xErr, dist), rc.get_delta_time())
+            else:
+                estimate = targetFilter.coast(rc.get_delta_time())
+                if estimate is not None:
+                    xErr, dist = estimate
+
+            targetBearing = xErr if dist != 0 else None
+
+            if frameWatchdog.failsafe:
+                # too slow or blind for too long, hold still until the watchdog recovers
+                rc.drive.stop()
+            else:
+                # the control loop picks this up and runs move_to_position() at its own rate
+                controlLoop.publish(xErr, dist)
+        else: # teleoperated move
+            # speed controls, allowing the speed to be staged up and down between 0% and 100%
+            if rc.controller.was_pressed(rc.controller.Button.LB):
+                if (speed + 0.1 >= 0.1):
+                    speed -= 0.1
+            elif rc.controller.was_pressed(rc.controller.Button.RB):
+                if (speed + 0.1 <= 1):
+                    speed += 0.1
+            
+            # set the speed to tthe joystick inputs
+            rc.drive.set_speed_angle(joystick_l[1], joystick_r[0])
+            driveOutput = (-joystick_r[0], joystick_l[1])
+
+    with timing.section('telemetry'):
+        # log this tick, the outputs are the last ones sent to the drive
+        recorder.record(rc.get_delta_time(), xErr, dist, driveOutput[0], driveOutput[1], speed, auton, flame)
+
+    frameWatchdog.end(expectMeasurement=auton)
 # END DEF
 
 '''
@@ -185,70 +352,25 @@ SERVO ELEVATOR CONTROL SUBSYSTEM
 '''
 
 # extends the elevator up and down on increments
+# the elevator thread moves there smoothly, an extension past the end of the range stops at the end
 def extend_elevator(input):
-    global servo_l_pos, servo_r_pos
-
-    # if extending outward
-    if (input > 0):
-        # if the extension would not be in the correct range, do not let it extend
-        if (servo_l_pos - rc.get_delta_time() * input < -1):
-            return
-        if (servo_r_pos + rc.get_delta_time() * input > 1):
-            return
-
-        servo_l_pos -= input
-        servo_r_pos += input
-    else:
-        input = -input
-        # if the retraction would not be in the correct range, do not let it retract
-        if (servo_l_pos + rc.get_delta_time() * input > 1):
-            return
-        if (servo_r_pos - rc.get_delta_time() * input < -1):
-            return
-                    
-        servo_l_pos += input
-        servo_r_pos -= input
-
-    # set the servos to the internally handled positioning
-    set_servo_pos()
+    global elevatorMotion
+
+    elevatorMotion.extend_by(input)
 # END DEF
 
 # rotates the manipulator on the end of the elevator
+# 1 rotates right and -1 left at diff_speed until called with 0, which brakes to a stop
 def rotate_elevator(input):
-    global servo_l_pos, servo_r_pos, diff_speed
-
-    # if rotating the diff to the right
-    if (input > 0):
-        # if either servo is at the maximum, disable rotation because otherwise the extension will change
-        if (servo_l_pos + rc.get_delta_time() * diff_speed > 1):
-            return  
-        if (servo_r_pos + rc.get_delta_time() * diff_speed > 1):
-            return
-
-        # increase values continously
-        servo_l_pos += rc.get_delta_time() * diff_speed
-        servo_r_pos += rc.get_delta_time() * diff_speed
-    else: # if rotating diff left
-        # max check
-        if (servo_l_pos - rc.get_delta_time() * diff_speed < -1):
-            return
-        if (servo_r_pos - rc.get_delta_time() * diff_speed < -1):
-            return
-
-        # continous move 
-        servo_l_pos -= rc.get_delta_time() * diff_speed
-        servo_r_pos -= rc.get_delta_time() * diff_speed
-
-    # set the servos to the internally handled positioning
-    set_servo_pos()
+    global elevatorMotion
+
+    elevatorMotion.rotate(input)
 # END DEF
 
-# sets the actual servo positions to the internally handled positions
+# hands the internally handled fan position to the servo output, which writes it at the end of the tick
 def set_servo_pos():
-    global servo_l, servo_r, servo_fan, servo_l_pos, servo_r_pos, servo_fan_pos
-    servo_l.value = servo_l_pos
-    servo_r.value = servo_r_pos
-    servo_fan.value = servo_fan_pos
+    global servoOutput, servo_fan_pos
+    servoOutput.set('fan', servo_fan_pos)
 # END DEF
 
 '''
@@ -259,51 +381,77 @@ NAVIGATION SUBSYSTEM
 
 '''
 
+# forgets the target from the last time the robot navigated, the rover has likely moved since
+# then (teleop, or stopped at a fire), so nothing from before may be coasted on
+def begin_navigation():
+    global targetBearing
+
+    targetFilter.reset()
+    tracker.reset()
+    targetBearing = None
+# END DEF
+
+# runs controlRate times per second on the control loop thread with the newest vision measurement
+# fresh is whether vision published it since the last call, only then is it a new sample
+def control_step(measurement, age, dt, fresh):
+    # only drive while autonomously navigating, teleop owns the drive otherwise
+    if not auton or measurement is None:
+        return
+
+    # the watchdog already stopped the drive, keep it that way
+    if frameWatchdog.failsafe:
+        return
+
+    # vision has not produced anything recent, so stop instead of steering on an old position
+    if age > maxMeasurementAge:
+        rc.drive.stop()
+        return
+
+    xErr, dist = measurement
+
+    # the object is gone and the tracker stopped predicting it
+    if dist == 0:
+        rc.drive.stop()
+        return
+
+    move_to_position(xErr, dist, dt, fresh)
+# END DEF
+
+controlLoop = control_loop.ControlScheduler(control_step, controlRate)
+
 # this function will get the robot the same line as the object, and then close in on it on the forward axis
-def move_to_position(xErr, dist):
-    global lastXErr, lastYErr, speed, avgX, avgY, xIntegral
+# dt is the time since the last call, by default the frame time
+# newSample is False when xErr and dist are the same measurement as in the last call
+def move_to_position(xErr, dist, dt=None, newSample=True):
+    global xPid, yPid, navStage, speed, outputFilter, driveOutput, alignThreshold
 
-    # 50 cm offset from object as target
-    yErr = (dist - 50)
+    if dt is None:
+        dt = rc.get_delta_time()
 
     # handles the staging of the navigation
-    canCloseDistance = False
+    # once pointing at the object within alignThreshold degrees the robot may close the distance
+    stage = 'close' if abs(xErr) <= alignThreshold else 'align'
+    canCloseDistance = stage == 'close'
 
-    # pid tuning individualized by axis
-    kpx = 1 #1
-    kix = 0.01 # 0.05
-    kdx = 0.1 #0.6
+    # start each stage with fresh controllers so state from the other stage does not leak in
+    if stage != navStage:
+        xPid.reset()
+        yPid.reset()
+        navStage = stage
 
-    kpy = 1 #1
-    kdy = 0.6 #0.6
+    # the controller keeps the integral and rate of change of rotation in degrees
+    xOutput = xPid.update(xErr, dt, newSample)
 
-    # recalculate x integral every frame
-    xIntegral += xErr * rc.get_delta_time()
-
-    # if not yet pointing at the object, recalculate the rotational output to converge on the point                                                           
-    if (abs(xErr) > 50):
-        # calculate the rate of change of rotation in cx units
-        xDeriv = (xErr - lastXErr)/rc.get_delta_time()
-        
-        # recalculate rotation output
-        xOutput = xErr * kpx + kix * xIntegral + xDeriv * kdx
-    else:
-        xDeriv = (xErr - lastXErr)/rc.get_delta_time()
-        xOutput = xErr * kpx + kix * xIntegral + xDeriv * kdx
-        
+    if canCloseDistance:
         # if within a reasonable range minimize rotational changes in order to have a forward movement
         xOutput *= -0.1
-        
-        # allow the robot to start moving forward toward the object when on the the line
-        canCloseDistance = True
 
         # 0 the turn integral to allow unbiased outputs
-        xIntegral = 0
+        xPid.reset_integral()
 
-    # y
+    # y, the controller's setpoint is the 50 cm offset from the object
     if (dist != 0 and canCloseDistance): # dist is 0 in the case of no detection, so if there is a detection recalculate pid
-        yDeriv = (yErr - lastYErr)/rc.get_delta_time()
-        yOutput = yErr * kpy + yDeriv * kdy
+        yOutput = yPid.update(dist, dt, newSample)
     else:
         # if getting onto the line, move backwards for consistent movements
         yOutput = -1
@@ -313,72 +461,51 @@ def move_to_position(xErr, dist):
     yOutput = rc_utils.clamp(yOutput, -1, 1)
 
     # reduces noise in the output to make sure that changes to the output are consistent and accurate
-    xOutput = low_pass(xOutput, avgX)
-    yOutput = low_pass(yOutput, avgY)
-
-    # recalculated for future derivative
-    lastXErr = xErr
-    lastYErr = yErr
+    xOutput, yOutput = outputFilter.update((xOutput, yOutput))
 
     # set the drive and turn actuators to the correct positions
     rc.drive.set_speed_angle(yOutput, -xOutput)
-# END DEF
-
-# this kind of filter is generally used to attenuate sensor noise 
-def low_pass(avg, val):
-    global lowPassThreshold
-    return (avg * lowPassThreshold) + (val * (1-lowPassThreshold))
+    driveOutput = (xOutput, yOutput)
 # END DEF
 
 # this function is used to find the nearest object within a certain color range
 # if it finds this object, it detects the largest of these objects in the view
 # the center of mass of this object is found, and thus used later as an offset on the x axis
+@timing.timed('find_object')
 def find_object():
-    global capture # currently unused
+    global tracker, cameraModel, targetProfile, detectionMode, debugDraw, rangeFinder
 
     # gets a numpy array in bgr format for each pixel in the camera view
     image = rc.camera.get_color_image()
 
-    # HSV THRESHOLDING FOR RED CONE
-    # hsvMin = (134,0,0)
-    # hsvMax = (179,255,255)
+    # hsv thresholds for the object we are looking for (red cone, deer or candle)
+    hsvMin, hsvMax = vision.HSV_PROFILES[targetProfile]
 
-    # thresholding for deer object
-    # hsvMin = (107,0,67)
-    # hsvMax = (124,185,207)
+    # finds the largest object within the given thresholds and its center of mass in y,x format
+    # in 'roi' mode only the area around the last detection is searched while the object is tracked
+    largestContour, center = vision.find_target(image, hsvMin, hsvMax, detectionMode, tracker)
 
-    # thresholding for candle object
-    hsvMin = (0,0,207)
-    hsvMax = (179,255,239)
-
-    # finds the outlines of any object within the given thresholds
-    contours = rc_utils.find_contours(image, hsvMin, hsvMax)
-
-    # finds the largest object, and returns it in numpy array form
-    largestContour = rc_utils.get_largest_contour(contours)
-
-    # if there is a contour, find its center of mass
-    if largestContour is not None:
-        # draw contour just draws it onto the image for debug purposes
-        rc_utils.draw_contour(image, largestContour, (0,255,0))
-        
-        # finds the center of mass in y,x format
-        center = rc_utils.get_contour_center(largestContour)
+    # if there is an object, use its center of mass
+    if center is not None:
+        # draw contour just draws it onto the image for debug purposes ('moments' mode has no contour)
+        if largestContour is not None and debugDraw:
+            rc_utils.draw_contour(image, largestContour, (0,255,0))
      
         centroidX = center[1]
 
-        # creates an error by creating an offset from the center in pixels
-        # because the camera has a width of 640 pixels, subtracting 320 creates a target on the midpoint
-        centroidXErr = centroidX - 320
+        # the error is the bearing of the object in degrees, positive to the right of the midpoint
+        centroidXErr = cameraModel.bearing(centroidX)
 
-        # usually this uses camera or lidar, but because of backend problems it is hardcoded to be a value that continually converges
-        distanceReading = 100
+        # the lidar range in the direction of the object, so the y controller slows down as it gets close
+        distanceReading = rangeFinder.lookup(rc.lidar.get_samples(), centroidX)
+        if distanceReading == 0:
+            # nothing returned around the object, keep closing in at the old constant
+            distanceReading = fallbackDistance
         
         return centroidXErr, distanceReading
 
-    # if no object was found, stop moving the robot
-    print('no object found')
-    rc.drive.set_speed_angle(0,0)
+    # no object was found (shows up as a dist of 0 in the telemetry), update() decides whether to
+    # coast on the prediction or stop
     return (0,0)
 # END DEF
 
@@ -390,83 +517,34 @@ LED DISPLAY MATRIX SUBSYSTEM
 
 '''
 
-# this function creates a new reference to the matrix (giving it a completely off state)
-# this matrix is then passed in to the letter functions, thus painting these letters onto the matrix
-# this temp matrix is then displayed to the actual matrix
-def write_fire():
+# called by the flame sensor from the gpio thread as soon as a fire starts
+def stop_for_fire():
     global auton
 
-    # create a new empty matrix
-    new_matrix = np.zeros((8,24), dtype=np.uint8)
-    
-    # draw letters
-    new_matrix = f(2, new_matrix)
-    new_matrix = i(3, new_matrix)
-    new_matrix = r(4, new_matrix)
-    new_matrix = e(4, new_matrix)
-
     # if a fire is detected, stop autonomously navigating toward the object because the object has been reached
-    auton = False
-
-    rc.display.set_matrix(new_matrix)
-# END DEF
-
-# render an F on a given matrix
-def f(offset, matrix):
-    proc_offset = offset - 1
-    for i in range(1,7):    
-        matrix[i, proc_offset] = 1
-    for i in range(1,5):
-        matrix[1, proc_offset+i] = 1
-    for i in range(1,5):
-        matrix[4, proc_offset+i] = 1
-
-    return matrix
-# END DEF
-
-# render an I on a given matrix
-def i(offset, matrix):
-    proc_offset = offset + 5
-    matrix[1, proc_offset] = 1
-    for i in range(3,7):
-        matrix[i,proc_offset] = 1
-
-    return matrix
+    if auton:
+        auton = False
+        rc.drive.stop()
 # END DEF
 
-# render an R on a given matrix
-def r(offset, matrix):
-    proc_offset = offset + 7
-    matrix[2, proc_offset+1] = 1
-    for i in range(1,7):
-        matrix[i, proc_offset] = 1 
-    for i in range(0,3):
-        matrix[1,proc_offset+i] = 1 
-    
-    return matrix
-# END DEF
+# shows FIRE on the matrix, the display thread draws it
+def write_fire():
+    global ledDisplay
 
-# render an E on a given matrix
-def e(offset, matrix):
-    proc_offset = offset + 12
-    for i in range(1,7):
-        matrix[i, proc_offset] = 1
-    for i in range(0,3):
-        matrix[1, proc_offset + i] = 1
-    for i in range(0,3):
-        matrix[4, proc_offset + i] = 1
-    for i in range(0,3):
-        matrix[6, proc_offset + i] = 1
-
-    return matrix
+    ledDisplay.show('FIRE', offset=1)
 # END DEF
 
+# no fire, so the matrix shows what the navigation is doing instead
+# the bearing to the object while tracking one, a scrolling SEARCHING while looking, or nothing in teleop
 def no_detection_matrix():
-    # create a matrix of zeroes for every single pixel
-    new_matrix = np.zeros((8,24), dtype=np.uint8)
+    global ledDisplay, auton, targetBearing
 
-    # display this turned off state on the matrix
-    rc.display.set_matrix(new_matrix)
+    if not auton:
+        ledDisplay.clear()
+    elif targetBearing is None:
+        ledDisplay.show('SEARCHING', scroll=12)
+    else:
+        ledDisplay.show(f'{targetBearing:.0f}', icon='target')
 # END DEF
 
 def update_slow():
@@ -480,6 +558,16 @@ def update_slow():
 
     if rc.controller.is_down(rc.controller.Button.RB):
         print("The right bumper is currently down (update_slow)")
+
+    # clicking the left stick prints where the time in update() goes
+    if rc.controller.is_down(rc.controller.Button.LJOY):
+        print(timing.summary())
+
+    # how well the control loop kept its rate over the last second
+    if auton:
+        print(controlLoop.summary())
+        print(frameWatchdog.summary())
+    controlLoop.reset_stats()
 # END DEF
 
 ########################################################################################
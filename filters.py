@@ -0,0 +1,210 @@
+"""
+File Name: filters.py
+
+Title: Signal filters
+
+Purpose: Smoothing for the navigation measurements and drive outputs. Every filter keeps its
+own state and works on several channels at once (for example x and y together), so one
+numpy operation filters all of them.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import math
+import numpy as np
+
+########################################################################################
+# Filters
+########################################################################################
+
+# exponential moving average, value += alpha * (sample - value)
+# alpha near 0 smooths a lot, alpha = 1 passes samples straight through
+class EmaFilter:
+    def __init__(self, alpha, channels=1):
+        self.alpha = alpha
+        self.value = np.zeros(channels, dtype=np.float64)
+        self.primed = False
+    # END DEF
+
+    # the next sample starts the filter over from that sample
+    def reset(self):
+        self.primed = False
+    # END DEF
+
+    # returns the filtered value of every channel
+    def update(self, sample):
+        sample = np.asarray(sample, dtype=np.float64)
+
+        if self.primed:
+            self.value += self.alpha * (sample - self.value)
+        else:
+            self.value[:] = sample
+            self.primed = True
+
+        return self.value.copy()
+    # END DEF
+
+# one euro filter (Casiez et al. 2012): an ema whose cutoff frequency rises with the speed of
+# the signal, so it smooths hard while the signal is steady and lags little while it moves
+# minCutoff (Hz) sets the smoothing at rest, beta how quickly the cutoff opens up with speed
+class OneEuroFilter:
+    def __init__(self, minCutoff=1.0, beta=0.0, derivativeCutoff=1.0, channels=1):
+        self.minCutoff = minCutoff
+        self.beta = beta
+        self.derivativeCutoff = derivativeCutoff
+
+        self.value = np.zeros(channels, dtype=np.float64)
+        self.derivative = np.zeros(channels, dtype=np.float64)
+        self.primed = False
+    # END DEF
+
+    def reset(self):
+        self.primed = False
+    # END DEF
+
+    # smoothing factor of an ema with the given cutoff (Hz) sampled every dt seconds
+    @staticmethod
+    def smoothing(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+    # END DEF
+
+    # returns the filtered value of every channel for a sample taken dt seconds after the last
+    def update(self, sample, dt):
+        sample = np.asarray(sample, dtype=np.float64)
+
+        if not self.primed:
+            self.value[:] = sample
+            self.derivative[:] = 0
+            self.primed = True
+            return self.value.copy()
+
+        # no time has passed, nothing new to learn from the sample
+        if not dt > 0:
+            return self.value.copy()
+
+        rawDerivative = (sample - self.value) / dt
+        self.derivative += self.smoothing(self.derivativeCutoff, dt) * (rawDerivative - self.derivative)
+
+        cutoff = self.minCutoff + self.beta * np.abs(self.derivative)
+        self.value += self.smoothing(cutoff, dt) * (sample - self.value)
+
+        return self.value.copy()
+    # END DEF
+
+# median of the last size samples, throws away single frame spikes without smoothing edges
+class MedianFilter:
+    def __init__(self, size=3, channels=1):
+        self.history = np.zeros((size, channels), dtype=np.float64)
+        self.reset()
+    # END DEF
+
+    def reset(self):
+        self.count = 0
+        self.index = 0
+    # END DEF
+
+    def update(self, sample):
+        self.history[self.index] = sample
+        self.index = (self.index + 1) % len(self.history)
+        self.count = min(self.count + 1, len(self.history))
+
+        return np.median(self.history[:self.count], axis=0)
+    # END DEF
+
+# constant velocity kalman filter for a target that can drop out of view, every channel is
+# tracked on its own (for example centroid x and range)
+# while there are detections update() corrects the estimate, during a dropout coast() keeps
+# predicting it from the last velocity until coastTime has passed
+# processNoise is the acceleration noise and measurementNoise the detection noise, as a
+# standard deviation per channel (or one for all)
+class KalmanTracker:
+    def __init__(self, processNoise=1.0, measurementNoise=1.0, coastTime=0.5, channels=1):
+        self.processVariance = np.broadcast_to(np.square(np.asarray(processNoise, dtype=np.float64)), channels).copy()
+        self.measurementVariance = np.broadcast_to(np.square(np.asarray(measurementNoise, dtype=np.float64)), channels).copy()
+        self.coastTime = coastTime
+
+        self.value = np.zeros(channels, dtype=np.float64)
+        self.velocity = np.zeros(channels, dtype=np.float64)
+        # covariance of (value, velocity) per channel, the matrix is symmetric so p01 is both corners
+        self.p00 = np.zeros(channels, dtype=np.float64)
+        self.p01 = np.zeros(channels, dtype=np.float64)
+        self.p11 = np.zeros(channels, dtype=np.float64)
+
+        self.reset()
+    # END DEF
+
+    # forgets the target, the next update() starts over from that sample
+    def reset(self):
+        self.primed = False
+        # seconds since the last detection
+        self.coasted = 0.0
+    # END DEF
+
+    # moves the estimate dt seconds ahead and grows its uncertainty
+    def predict(self, dt):
+        q = self.processVariance
+
+        self.value += self.velocity * dt
+        self.p00 += 2 * dt * self.p01 + dt * dt * self.p11 + q * dt ** 4 / 4
+        self.p01 += dt * self.p11 + q * dt ** 3 / 2
+        self.p11 += q * dt * dt
+    # END DEF
+
+    # a detection taken dt seconds after the last call, returns the estimate of every channel
+    def update(self, sample, dt):
+        sample = np.asarray(sample, dtype=np.float64)
+        self.coasted = 0.0
+
+        if not self.primed:
+            self.value[:] = sample
+            self.velocity[:] = 0
+            # as sure as one detection, with no idea of the velocity yet
+            self.p00[:] = self.measurementVariance
+            self.p01[:] = 0
+            self.p11[:] = self.measurementVariance / max(dt, 1e-3) ** 2
+            self.primed = True
+            return self.value.copy()
+
+        if dt > 0:
+            self.predict(dt)
+
+        # kalman gain for the value and the velocity
+        innovation = sample - self.value
+        s = self.p00 + self.measurementVariance
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+
+        self.value += k0 * innovation
+        self.velocity += k1 * innovation
+
+        p01 = self.p01
+        self.p11 -= k1 * p01
+        self.p01 = (1 - k0) * p01
+        self.p00 *= 1 - k0
+
+        return self.value.copy()
+    # END DEF
+
+    # no detection for dt seconds, returns the predicted estimate, or None once the target
+    # has been gone for longer than coastTime (or was never seen)
+    def coast(self, dt):
+        if not self.primed:
+            return None
+
+        self.coasted += dt
+        if self.coasted > self.coastTime:
+            self.reset()
+            return None
+
+        if dt > 0:
+            self.predict(dt)
+        return self.value.copy()
+    # END DEF
+
+    # standard deviation of the estimate of every channel, small means confident
+    def deviation(self):
+        return np.sqrt(self.p00)
+    # END DEF
@@ -0,0 +1,139 @@
+"""
+File Name: flame_sensor.py
+
+Title: Flame sensor
+
+Purpose: Reads the flame sensor from gpiozero's edge callbacks instead of polling its value
+every frame. Every debounced change is stored with its time in a ring, so a flicker between
+two frames is not missed, the stop can happen the moment the fire is seen (onFire), and
+the display can hold a steady answer:
+
+    flameSensor = flame_sensor.FlameSensor(5, onFire=stop_for_fire)
+    if flameSensor.fire_within(0.5):
+        ...
+
+The sensor is active low, a value of 0 means fire.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+from time import monotonic
+import numpy as np
+from gpiozero import DigitalInputDevice
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# seconds the pin has to settle before a change counts
+BOUNCE_TIME = 0.01
+
+# changes kept in the ring
+EVENT_CAPACITY = 256
+
+########################################################################################
+# Flame sensor
+########################################################################################
+
+class FlameSensor:
+    def __init__(self, pin=5, bounceTime=BOUNCE_TIME, capacity=EVENT_CAPACITY, onFire=None, device=None):
+        # called from the gpio thread as soon as a fire starts, keep it short
+        self.onFire = onFire
+
+        # the time of every change and whether it started (1) or ended (0) a fire
+        # only the gpio thread writes, it fills a slot before counting it so readers never
+        # see a half written event
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.states = np.zeros(capacity, dtype=np.int8)
+        self.count = 0
+
+        if device is None:
+            device = DigitalInputDevice(pin, bounce_time=bounceTime)
+        self.device = device
+
+        # the state at startup is the first event
+        self.record(self.device.value == 0)
+
+        # the pin reads 0 on fire, so the device going inactive is a fire starting
+        self.device.when_deactivated = self.fire_started
+        self.device.when_activated = self.fire_ended
+    # END DEF
+
+    def record(self, fire):
+        index = self.count % len(self.times)
+        self.times[index] = monotonic()
+        self.states[index] = fire
+        self.count += 1
+    # END DEF
+
+    def fire_started(self):
+        self.record(True)
+        if self.onFire is not None:
+            self.onFire()
+    # END DEF
+
+    def fire_ended(self):
+        self.record(False)
+    # END DEF
+
+    # the pin value the old code read every frame, 0 on fire
+    @property
+    def value(self):
+        return 0 if self.fire else 1
+    # END DEF
+
+    # whether there is a fire right now
+    @property
+    def fire(self):
+        return bool(self.states[(self.count - 1) % len(self.states)])
+    # END DEF
+
+    # (times, states) of the stored events in order, oldest first
+    def events(self):
+        count = self.count
+        capacity = len(self.times)
+        if count <= capacity:
+            return self.times[:count].copy(), self.states[:count].copy()
+
+        order = (np.arange(count - capacity, count)) % capacity
+        return self.times[order], self.states[order]
+    # END DEF
+
+    # whether there was a fire at any moment since the monotonic time since
+    def fire_since(self, since):
+        times, states = self.events()
+
+        # a fire started after since, or one was already going at since
+        first = int(np.searchsorted(times, since))
+        return bool(np.any(states[first:]) or (first > 0 and states[first - 1]))
+    # END DEF
+
+    # whether there was a fire at any moment in the last seconds
+    def fire_within(self, seconds):
+        return self.fire_since(monotonic() - seconds)
+    # END DEF
+
+    # monotonic time the last fire started, or None if there has not been one
+    def last_fire(self):
+        times, states = self.events()
+        started = times[states == 1]
+        return float(started[-1]) if len(started) else None
+    # END DEF
+
+    # fraction of the last seconds that there was a fire, 0 to 1
+    def duty_cycle(self, seconds):
+        now = monotonic()
+        start = now - seconds
+        times, states = self.events()
+
+        # every state lasts until the next event, or until now for the last one
+        ends = np.append(times[1:], now)
+        durations = np.clip(ends, start, now) - np.clip(times, start, now)
+        return float(np.sum(durations[states == 1]) / seconds)
+    # END DEF
+
+    def close(self):
+        self.device.close()
+    # END DEF
@@ -0,0 +1,189 @@
+"""
+File Name: led_display.py
+
+Title: LED matrix display service
+
+Purpose: Draws the 8x24 led matrix on its own thread at a fixed refresh rate, so scrolling
+and blinking cost update() nothing. update() only hands over what to show:
+
+    ledDisplay = led_display.LedDisplay(rc.display)
+    ledDisplay.start()
+    ledDisplay.show('FIRE', offset=1)
+    ledDisplay.show('SEARCHING', scroll=12)
+    ledDisplay.show('-12', icon='target')
+
+show() never blocks. The newest message replaces the one showing, and repeating the message
+that is already showing is free. Text comes from led_font.py, and frames only go to the
+display when they change.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import queue
+from collections import namedtuple
+from time import monotonic, sleep
+import numpy as np
+
+import led_font
+from clocked_service import ClockedService
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# frames per second drawn by the display thread
+REFRESH_RATE = 20
+
+# status icons as rows of text, X is a lit pixel
+ICON_ROWS = {
+    'target': ['...X...', '.XXXXX.', '.X.X.X.', 'XXX.XXX', '.X.X.X.', '.XXXXX.', '...X...', '.......'],
+    'fire': ['..X..', '..X..', '.XXX.', '.XXX.', 'XX.XX', 'X...X', 'XX.XX', '.XXX.'],
+    'warning': ['...X...', '..X.X..', '..X.X..', '.X.X.X.', '.X.X.X.', 'X.....X', 'X..X..X', 'XXXXXXX'],
+    'battery': ['........', 'XXXXXXX.', 'X.....XX', 'X.XXX.XX', 'X.XXX.XX', 'X.....XX', 'XXXXXXX.', '........'],
+}
+
+# the compiled bitmap of every icon
+ICONS = {name: np.array([[1 if pixel == 'X' else 0 for pixel in row] for row in rows], dtype=np.uint8)
+         for name, rows in ICON_ROWS.items()}
+
+# what to show, see LedDisplay.show()
+Message = namedtuple('Message', ['text', 'scroll', 'blink', 'icon', 'offset'])
+
+BLANK_MESSAGE = Message('', 0, 0, None, 0)
+
+########################################################################################
+# Rendering
+########################################################################################
+
+# copies the part of bitmap that lands on frame with its left edge at column
+def place(frame, bitmap, column):
+    start = max(column, 0)
+    end = min(column + bitmap.shape[1], frame.shape[1])
+    if start < end:
+        frame[:, start:end] = bitmap[:, start - column:end - column]
+# END DEF
+
+# the frame for a message that has been showing for elapsed seconds
+def render_message(message, elapsed, frame):
+    # blinking messages are blank for the second half of every period
+    if message.blink > 0 and (elapsed * message.blink) % 1 >= 0.5:
+        return led_font.BLANK
+
+    # plain static text is already cached by the font
+    if message.icon is None and message.scroll == 0:
+        return led_font.render(message.text, message.offset)
+
+    frame.fill(0)
+
+    # the icon sits on the left, the text gets the rest of the matrix
+    left = 0
+    if message.icon is not None:
+        icon = ICONS[message.icon]
+        place(frame, icon, 0)
+        left = icon.shape[1] + led_font.GAP
+
+    strip = led_font.render_strip(message.text)
+    area = frame[:, left:]
+
+    if message.scroll > 0:
+        # enters on the right, leaves on the left, then starts over
+        travel = area.shape[1] + strip.shape[1]
+        column = area.shape[1] - int(elapsed * message.scroll) % travel
+    else:
+        column = message.offset
+
+    place(area, strip, column)
+    return frame
+# END DEF
+
+########################################################################################
+# Display service
+########################################################################################
+
+class LedDisplay(ClockedService):
+    threadName = 'led-display'
+
+    def __init__(self, display, rate=REFRESH_RATE, clock=monotonic):
+        self.writer = led_font.FrameWriter(display)
+        self.rate = rate
+        self.init_clock(clock)
+
+        # messages from show(), only the newest one matters
+        self.messages = queue.Queue(maxsize=1)
+        # the last message handed to show(), so repeating it costs nothing
+        self.requested = BLANK_MESSAGE
+
+        self.message = BLANK_MESSAGE
+        self.shownSince = self.clock()
+        self.frame = np.zeros((led_font.ROWS, led_font.COLUMNS), dtype=np.uint8)
+    # END DEF
+
+    # shows text from now on, never blocks
+    # scroll is in columns per second (0 keeps it still at offset), blink in flashes per second,
+    # icon is one of ICONS drawn on the left
+    def show(self, text='', scroll=0, blink=0, icon=None, offset=0):
+        message = Message(text, scroll, blink, icon, offset)
+        if message == self.requested:
+            return
+        self.requested = message
+
+        # replace whatever the display thread has not picked up yet
+        try:
+            self.messages.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            pass
+    # END DEF
+
+    def clear(self):
+        self.show()
+    # END DEF
+
+    def start(self):
+        # whatever is on the matrix from the last run gets redrawn
+        self.writer.invalidate()
+        super().start()
+    # END DEF
+
+    def use_clock(self, clock):
+        super().use_clock(clock)
+        self.shownSince = clock()
+    # END DEF
+
+    # draws one frame as of time now, called by the display thread
+    def refresh(self, now=None):
+        if now is None:
+            now = self.clock()
+
+        try:
+            message = self.messages.get_nowait()
+            if message != self.message:
+                self.message = message
+                self.shownSince = now
+        except queue.Empty:
+            pass
+
+        self.writer.write(render_message(self.message, now - self.shownSince, self.frame))
+    # END DEF
+
+    # draws one frame for a display driven from outside
+    def step(self, now=None):
+        self.refresh(now)
+    # END DEF
+
+    def run(self):
+        period = 1.0 / self.rate
+        nextRefresh = self.clock()
+
+        while self.running:
+            self.refresh()
+
+            # fixed rate, a late frame is not made up for
+            nextRefresh = max(nextRefresh + period, self.clock())
+            sleep(max(nextRefresh - self.clock(), 0))
+    # END DEF
@@ -0,0 +1,187 @@
+"""
+File Name: led_font.py
+
+Title: LED matrix font
+
+Purpose: Text for the 8x24 led matrix without drawing it pixel by pixel every frame. Every
+glyph is compiled into a numpy bitmap once at import, rendered frames are kept in an LRU
+cache keyed by text and offset, and FrameWriter only sends a frame to the display when it
+differs from the one already showing. Every frame that is sent is timed as the 'set_matrix'
+section of timing.py.
+
+    ledWriter = led_font.FrameWriter(rc.display)
+    ledWriter.write(led_font.render('FIRE', 1))
+
+The glyphs for F, I, R and E are the ones write_fire() used to draw by hand, so 'FIRE' at
+offset 1 is the same picture as before.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import functools
+import numpy as np
+
+import timing
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# size of the led matrix
+ROWS = 8
+COLUMNS = 24
+
+# glyphs are drawn on rows 1 to 6, with this many blank columns between them
+TOP = 1
+GAP = 2
+
+# rendered frames kept by render()
+FRAME_CACHE_SIZE = 64
+
+# every glyph as rows of text, X is a lit pixel
+FONT = {
+    'A': ['.X.', 'X.X', 'X.X', 'XXX', 'X.X', 'X.X'],
+    'B': ['XX.', 'X.X', 'XX.', 'X.X', 'X.X', 'XX.'],
+    'C': ['.XX', 'X..', 'X..', 'X..', 'X..', '.XX'],
+    'D': ['XX.', 'X.X', 'X.X', 'X.X', 'X.X', 'XX.'],
+    'E': ['XXX', 'X..', 'X..', 'XXX', 'X..', 'XXX'],
+    'F': ['XXXXX', 'X....', 'X....', 'XXXXX', 'X....', 'X....'],
+    'G': ['.XX', 'X..', 'X..', 'X.X', 'X.X', '.XX'],
+    'H': ['X.X', 'X.X', 'X.X', 'XXX', 'X.X', 'X.X'],
+    'I': ['X', '.', 'X', 'X', 'X', 'X'],
+    'J': ['..X', '..X', '..X', '..X', 'X.X', '.X.'],
+    'K': ['X.X', 'X.X', 'XX.', 'X.X', 'X.X', 'X.X'],
+    'L': ['X..', 'X..', 'X..', 'X..', 'X..', 'XXX'],
+    'M': ['X...X', 'XX.XX', 'X.X.X', 'X...X', 'X...X', 'X...X'],
+    'N': ['X..X', 'XX.X', 'X.XX', 'X..X', 'X..X', 'X..X'],
+    'O': ['.X.', 'X.X', 'X.X', 'X.X', 'X.X', '.X.'],
+    'P': ['XX.', 'X.X', 'XX.', 'X..', 'X..', 'X..'],
+    'Q': ['.X.', 'X.X', 'X.X', 'X.X', 'XX.', '.XX'],
+    'R': ['XXX', 'XX.', 'X..', 'X..', 'X..', 'X..'],
+    'S': ['.XX', 'X..', '.X.', '..X', '..X', 'XX.'],
+    'T': ['XXX', '.X.', '.X.', '.X.', '.X.', '.X.'],
+    'U': ['X.X', 'X.X', 'X.X', 'X.X', 'X.X', 'XXX'],
+    'V': ['X.X', 'X.X', 'X.X', 'X.X', 'X.X', '.X.'],
+    'W': ['X...X', 'X...X', 'X...X', 'X.X.X', 'XX.XX', 'X...X'],
+    'X': ['X.X', 'X.X', '.X.', '.X.', 'X.X', 'X.X'],
+    'Y': ['X.X', 'X.X', '.X.', '.X.', '.X.', '.X.'],
+    'Z': ['XXX', '..X', '.X.', '.X.', 'X..', 'XXX'],
+    '0': ['XXX', 'X.X', 'X.X', 'X.X', 'X.X', 'XXX'],
+    '1': ['.X.', 'XX.', '.X.', '.X.', '.X.', 'XXX'],
+    '2': ['XXX', '..X', '..X', 'XXX', 'X..', 'XXX'],
+    '3': ['XXX', '..X', 'XXX', '..X', '..X', 'XXX'],
+    '4': ['X.X', 'X.X', 'XXX', '..X', '..X', '..X'],
+    '5': ['XXX', 'X..', 'XXX', '..X', '..X', 'XXX'],
+    '6': ['XXX', 'X..', 'XXX', 'X.X', 'X.X', 'XXX'],
+    '7': ['XXX', '..X', '..X', '.X.', '.X.', '.X.'],
+    '8': ['XXX', 'X.X', 'XXX', 'X.X', 'X.X', 'XXX'],
+    '9': ['XXX', 'X.X', 'XXX', '..X', '..X', 'XXX'],
+    ' ': ['..', '..', '..', '..', '..', '..'],
+    '!': ['X', 'X', 'X', 'X', '.', 'X'],
+    '?': ['XXX', '..X', '.X.', '.X.', '...', '.X.'],
+    '.': ['.', '.', '.', '.', '.', 'X'],
+    ':': ['.', 'X', '.', '.', 'X', '.'],
+    '-': ['...', '...', 'XXX', '...', '...', '...'],
+}
+
+########################################################################################
+# Glyphs
+########################################################################################
+
+# turns rows of text into a (ROWS, width) bitmap with the glyph on rows TOP and down
+def compile_glyph(rows):
+    bitmap = np.zeros((ROWS, len(rows[0])), dtype=np.uint8)
+    bitmap[TOP:TOP + len(rows)] = [[1 if pixel == 'X' else 0 for pixel in row] for row in rows]
+    return bitmap
+# END DEF
+
+# the compiled bitmap of every glyph in FONT
+GLYPHS = {char: compile_glyph(rows) for char, rows in FONT.items()}
+
+########################################################################################
+# Rendering
+########################################################################################
+
+# the whole text as one (ROWS, width) bitmap, letters missing from the font show as '?'
+@functools.lru_cache(maxsize=FRAME_CACHE_SIZE)
+def render_strip(text):
+    glyphs = [GLYPHS.get(char, GLYPHS['?']) for char in text.upper()]
+    if not glyphs:
+        return np.zeros((ROWS, 0), dtype=np.uint8)
+
+    parts = []
+    for glyph in glyphs:
+        parts.append(glyph)
+        parts.append(np.zeros((ROWS, GAP), dtype=np.uint8))
+    strip = np.hstack(parts[:-1])
+
+    strip.setflags(write=False)
+    return strip
+# END DEF
+
+# width of the text in columns
+def text_width(text):
+    return render_strip(text).shape[1]
+# END DEF
+
+# a full (ROWS, COLUMNS) frame with the text starting at column offset, which may be negative
+# or past the edge for scrolling
+# frames are shared by the cache, so they are read only
+@functools.lru_cache(maxsize=FRAME_CACHE_SIZE)
+def render(text, offset=0):
+    strip = render_strip(text)
+    frame = np.zeros((ROWS, COLUMNS), dtype=np.uint8)
+
+    # the part of the strip that lands on the matrix
+    start = max(offset, 0)
+    end = min(offset + strip.shape[1], COLUMNS)
+    if start < end:
+        frame[:, start:end] = strip[:, start - offset:end - offset]
+
+    frame.setflags(write=False)
+    return frame
+# END DEF
+
+# every pixel off and every pixel on
+BLANK = np.zeros((ROWS, COLUMNS), dtype=np.uint8)
+BLANK.setflags(write=False)
+FULL = np.ones((ROWS, COLUMNS), dtype=np.uint8)
+FULL.setflags(write=False)
+
+########################################################################################
+# Display writes
+########################################################################################
+
+# sends frames to the display only when they change
+# the sends are timed as one timing section, so a process should write from a single thread
+class FrameWriter:
+    def __init__(self, display):
+        self.display = display
+        self.last = None
+
+        # how many frames were sent and how many were skipped as unchanged
+        self.writes = 0
+        self.skipped = 0
+    # END DEF
+
+    # the next write() goes to the display no matter what, e.g. after something else drew on it
+    def invalidate(self):
+        self.last = None
+    # END DEF
+
+    # returns whether the frame was sent
+    def write(self, frame):
+        if self.last is not None and (frame is self.last or np.array_equal(frame, self.last)):
+            self.skipped += 1
+            return False
+
+        with timing.section('set_matrix'):
+            self.display.set_matrix(frame)
+        self.writes += 1
+
+        # cached frames never change, anything else might be reused by the caller
+        self.last = frame if not frame.flags.writeable else frame.copy()
+        return True
+    # END DEF
@@ -0,0 +1,133 @@
+"""
+File Name: lidar_range.py
+
+Title: LIDAR range lookup
+
+Purpose: Gives the distance to whatever is at a column of the camera image. Every column is
+mapped ahead of time to the window of LIDAR samples around its bearing (from the 110 degree
+camera fov), so a lookup is one numpy gather over rc.lidar.get_samples() and a robust
+minimum or median over that window. Samples without a return (0) are ignored.
+
+    rangeFinder = lidar_range.LidarRange(camera_model.CameraModel(640, 480))
+    dist = rangeFinder.lookup(rc.lidar.get_samples(), centroidX)
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import numpy as np
+
+import camera_model
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# the lidar gives 720 samples, one per half degree, clockwise starting straight ahead
+LIDAR_SAMPLES = 720
+
+# degrees of lidar on each side of a column's bearing that count as the object
+WINDOW = 3
+
+# how lookup() combines the window, 'min' (robust minimum) or 'median'
+STATISTICS = ('min', 'median')
+
+########################################################################################
+# Range lookup
+########################################################################################
+
+class LidarRange:
+    def __init__(self, cameraModel=None, samples=LIDAR_SAMPLES, window=WINDOW, statistic='min', rejectCount=1):
+        if statistic not in STATISTICS:
+            raise ValueError(f'unknown statistic {statistic}, expected one of {STATISTICS}')
+
+        self.statistic = statistic
+        # the closest rejectCount returns are treated as noise by the robust minimum
+        self.rejectCount = rejectCount
+
+        # bearing of every column in degrees, positive to the right (see camera_model.py)
+        if cameraModel is None:
+            cameraModel = camera_model.CameraModel()
+        bearings = cameraModel.bearings
+
+        # sample indices of the window around every column, shape (width, window size)
+        # clockwise means a bearing to the right is a small index and to the left wraps around
+        self.samples = samples
+        perDegree = samples / 360
+        offsets = np.arange(-round(window * perDegree), round(window * perDegree) + 1)
+        centers = np.rint(bearings * perDegree).astype(np.int64)
+        self.table = (centers[:, None] + offsets[None, :]) % samples
+    # END DEF
+
+    # distance (lidar units, cm) at the given image column, or 0 if nothing in the window returned
+    # or the scan does not have the number of samples the table was built for
+    def lookup(self, samples, column):
+        samples = np.asarray(samples)
+        if len(samples) != self.samples:
+            return 0
+
+        column = min(max(int(column), 0), len(self.table) - 1)
+
+        window = samples[self.table[column]]
+        valid = window[window > 0]
+        if len(valid) == 0:
+            return 0
+
+        if self.statistic == 'median':
+            return float(np.median(valid))
+
+        # the smallest distance after throwing away the closest few, so one stray return
+        # (dust, a wheel) does not decide the range
+        k = min(self.rejectCount, len(valid) - 1)
+        return float(np.partition(valid, k)[k])
+    # END DEF
+
+    # lookup() for many columns at once, returns an array with 0 where nothing returned
+    def lookup_many(self, samples, columns):
+        columns = np.clip(np.asarray(columns, dtype=np.int64), 0, len(self.table) - 1)
+
+        samples = np.asarray(samples)
+        if len(samples) != self.samples:
+            return np.zeros(len(columns))
+
+        # no return sorts last, so the valid distances come first in every row
+        windows = samples.astype(np.float64)[self.table[columns]]
+        windows[windows <= 0] = np.inf
+        windows.sort(axis=1)
+        counts = np.count_nonzero(np.isfinite(windows), axis=1)
+
+        if self.statistic == 'median':
+            low = windows[np.arange(len(columns)), np.maximum(counts - 1, 0) // 2]
+            high = windows[np.arange(len(columns)), np.maximum(counts, 1) // 2]
+            result = (low + high) / 2
+        else:
+            result = windows[np.arange(len(columns)), np.minimum(self.rejectCount, np.maximum(counts - 1, 0))]
+
+        result[counts == 0] = 0
+        return result
+    # END DEF
+
+# checks lookup() and lookup_many() against each other on random scans in the dtypes the
+# racecar and the headless racecar give
+def self_check():
+    generator = np.random.default_rng(0)
+    for dtype in (np.float32, np.float64):
+        samples = generator.uniform(20, 500, LIDAR_SAMPLES).astype(dtype)
+        samples[generator.random(LIDAR_SAMPLES) < 0.3] = 0
+
+        for statistic in STATISTICS:
+            rangeFinder = LidarRange(statistic=statistic)
+            columns = np.arange(0, camera_model.IMAGE_WIDTH, 7)
+            single = np.array([rangeFinder.lookup(samples, column) for column in columns])
+            assert np.allclose(single, rangeFinder.lookup_many(samples, columns)), (dtype, statistic)
+
+        # a scan of the wrong size has no usable bearings
+        assert rangeFinder.lookup(samples[:100], 320) == 0
+        assert not rangeFinder.lookup_many(samples[:100], [0, 320]).any()
+
+    print('lidar_range ok')
+# END DEF
+
+if __name__ == "__main__":
+    self_check()
@@ -0,0 +1,188 @@
+"""
+File Name: motion_profile.py
+
+Title: Elevator motion profiles
+
+Purpose: Moves the elevator smoothly toward extension and rotation setpoints on its own
+thread at a fixed rate, independent of the update() frame rate. Every axis follows a
+trapezoidal profile: it speeds up at a limited acceleration, cruises at a limited
+velocity and slows down in time to stop on the target.
+
+The two elevator servos work as a differential:
+    left = -extension + rotation
+    right = extension + rotation
+so |extension| + |rotation| can be at most 1.
+
+    elevatorMotion = motion_profile.ElevatorMotion(servoOutput)
+    elevatorMotion.start()
+    elevatorMotion.extend_by(0.2)
+    elevatorMotion.rotate(1)
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import math
+import threading
+from time import monotonic, sleep
+
+from clocked_service import ClockedService
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# steps per second of the motion thread
+RATE = 100
+
+# limits in servo units (-1 to 1) per second and per second squared
+EXTENSION_VELOCITY = 1.0
+ROTATION_VELOCITY = 0.5
+ACCELERATION = 4.0
+
+########################################################################################
+# Trapezoidal profile
+########################################################################################
+
+class TrapezoidProfile:
+    def __init__(self, maxVelocity, maxAcceleration, position=0.0):
+        self.maxVelocity = maxVelocity
+        self.maxAcceleration = maxAcceleration
+        self.position = position
+        self.velocity = 0.0
+        self.target = position
+    # END DEF
+
+    # where the axis would come to rest if it started braking now
+    def stopping_point(self):
+        distance = self.velocity * self.velocity / (2 * self.maxAcceleration)
+        return self.position + math.copysign(distance, self.velocity)
+    # END DEF
+
+    def done(self):
+        return self.position == self.target and self.velocity == 0
+    # END DEF
+
+    # moves the axis dt seconds along the profile toward the target
+    def step(self, dt):
+        remaining = self.target - self.position
+
+        # close enough and slow enough to stop on the target this step
+        if abs(remaining) <= self.maxAcceleration * dt * dt and abs(self.velocity) <= self.maxAcceleration * dt:
+            self.position = self.target
+            self.velocity = 0.0
+            return
+
+        # the fastest speed that can still brake in time, capped at the cruise speed
+        desired = math.copysign(min(self.maxVelocity, math.sqrt(2 * self.maxAcceleration * abs(remaining))), remaining)
+
+        # change speed by at most the acceleration limit
+        change = self.maxAcceleration * dt
+        self.velocity += min(max(desired - self.velocity, -change), change)
+
+        self.position += self.velocity * dt
+
+        # do not run past the target
+        if (self.target - self.position) * remaining < 0:
+            self.position = self.target
+            self.velocity = 0.0
+    # END DEF
+
+########################################################################################
+# Elevator
+########################################################################################
+
+class ElevatorMotion(ClockedService):
+    threadName = 'elevator-motion'
+
+    def __init__(self, servoOutput, rate=RATE, extensionVelocity=EXTENSION_VELOCITY,
+                 rotationVelocity=ROTATION_VELOCITY, acceleration=ACCELERATION, left='left', right='right',
+                 clock=monotonic):
+        # servo_output.ServoOutput with the two elevator channels, only this thread flushes it
+        self.servoOutput = servoOutput
+        self.left = left
+        self.right = right
+        self.rate = rate
+
+        self.extension = TrapezoidProfile(extensionVelocity, acceleration)
+        self.rotation = TrapezoidProfile(rotationVelocity, acceleration)
+
+        # setpoints come from update() while the thread steps the profiles
+        self.lock = threading.Lock()
+        self.init_clock(clock)
+        # time of the last step()
+        self.lastStep = None
+    # END DEF
+
+    # the extension setpoint, limited so both servos stay in range at the rotation setpoint
+    def set_extension(self, target):
+        with self.lock:
+            limit = 1 - abs(self.rotation.target)
+            self.extension.target = min(max(target, -limit), limit)
+    # END DEF
+
+    def extend_by(self, amount):
+        self.set_extension(self.extension.target + amount)
+    # END DEF
+
+    # the rotation setpoint, limited so both servos stay in range at the extension setpoint
+    def set_rotation(self, target):
+        with self.lock:
+            limit = 1 - abs(self.extension.target)
+            self.rotation.target = min(max(target, -limit), limit)
+    # END DEF
+
+    # keeps rotating while a direction (1 or -1) is held, 0 brakes to a stop as soon as possible
+    def rotate(self, direction):
+        if direction == 0:
+            with self.lock:
+                self.rotation.target = self.rotation.stopping_point()
+        else:
+            self.set_rotation(math.copysign(1, direction))
+    # END DEF
+
+    # (left, right) servo positions for the current profile positions
+    def positions(self):
+        extension = self.extension.position
+        rotation = self.rotation.position
+        return -extension + rotation, extension + rotation
+    # END DEF
+
+    # moves both axes dt seconds and hands the new positions to the servo output
+    def advance(self, dt):
+        with self.lock:
+            self.extension.step(dt)
+            self.rotation.step(dt)
+            left, right = self.positions()
+
+        # the servo output clamps to the servo range while the two axes settle
+        self.servoOutput.set(self.left, left)
+        self.servoOutput.set(self.right, right)
+        self.servoOutput.flush()
+    # END DEF
+
+    def use_clock(self, clock):
+        super().use_clock(clock)
+        self.lastStep = None
+    # END DEF
+
+    # moves by the time that passed since the last step, so a late wakeup does not slow the
+    # motion down, and a long gap moves at most 4 periods
+    def step(self, now=None):
+        if now is None:
+            now = self.clock()
+
+        if self.lastStep is not None:
+            self.advance(min(now - self.lastStep, 4 / self.rate))
+        self.lastStep = now
+    # END DEF
+
+    def run(self):
+        period = 1.0 / self.rate
+        self.lastStep = self.clock()
+
+        while self.running:
+            sleep(period)
+            self.step()
+    # END DEF
@@ -29,13 +29,19 @@ Expected Outcome: Terminal output and RACECAR movement occurs when buttons are p
 #racecar sim navigation.py
 
 import sys
-from time import time
+from time import time, monotonic
 import math as Math
-import cv2 as cv
 
 sys.path.insert(0, '../library')
 import racecar_core
 import racecar_utils as rc_utils
+import vision
+import camera
+import pid
+import filters
+import telemetry
+import lidar_range
+import camera_model
 
 ########################################################################################
 # Global variables
@@ -43,25 +49,65 @@ import racecar_utils as rc_utils
 
 rc = racecar_core.create_racecar()
 auton = False
-lastXErr = 0
-lastYErr = 0
 speed = 0.5
 
-avgX = 0
-avgY = 0
-lowPassThreshold = 0.8
+# one controller per axis, x steers onto the object and y closes to 50 cm from it
+# the x error is in degrees, the gains are the old pixel gains times 3.91 px per degree
+# the x output is scaled and clamped by move_to_position() itself, so it has no output limit
+xPid = pid.PID(kp=3.91, ki=0.039, kd=0.391, outputLimits=None)
+yPid = pid.PID(kp=1, kd=0.6, setpoint=50)
 
-xIntegral = 0
+# degrees from the object at which the robot starts closing the distance (50 px at 640 wide)
+alignThreshold = 12.5
 
-capture = None
+# which stage of the navigation is running, 'align' or 'close'
+navStage = None
 
-for i in range(100):
-    if (capture == None):
-        capture = cv.VideoCapture(i)
-        print(f"not found at position: {i}" )
-        continue
-    print(f"found at position: {i}")
-    break
+# smooths the (xErr, dist) measurements and the (x, y) drive outputs
+measurementFilter = filters.OneEuroFilter(minCutoff=1.0, beta=0.01, channels=2)
+outputFilter = filters.EmaFilter(alpha=0.2, channels=2)
+
+# logs every update() tick to telemetry/ instead of printing (see telemetry.py)
+recorder = telemetry.TelemetryRecorder('navigation')
+
+# only searches around the last detection instead of the whole frame (see vision.py)
+tracker = vision.RoiTracker()
+
+# how find_object() searches the frame, one of vision.DETECTION_MODES
+detectionMode = 'roi'
+
+# the object to drive to, one of the profiles in vision.HSV_PROFILES
+targetProfile = 'deer'
+
+# finds the usb camera from /dev/video*, trying the last working one first (see camera.py)
+# the capture is opened with camera.CAPTURE_SETTINGS, and the driver may grant something else
+capture, captureIndex, captureSettings = camera.discover_camera()
+
+if capture is None:
+    print("no camera found")
+    captureSettings = camera.CAPTURE_SETTINGS
+
+# bearings of the image columns for the granted resolution, the x error is measured in degrees
+cameraModel = camera_model.CameraModel(captureSettings['width'], captureSettings['height'])
+
+# distance to the object from the lidar samples around its column
+rangeFinder = lidar_range.LidarRange(cameraModel)
+
+# grabs frames in the background so find_object() never waits on the camera
+captureWorker = camera.CaptureWorker(capture)
+if capture is not None:
+    captureWorker.start()
+
+# frames older than this (seconds) are treated as no detection
+maxFrameAge = 0.25
+
+# sequence number and result of the last processed frame, reused until a new frame arrives
+lastFrameSeq = 0
+lastResult = (0,0)
+
+# filtered result of the last new frame, and seconds of updates since the filter last ran
+filteredResult = (0,0)
+filterDt = 0
 
 # size of color matrix
 
@@ -76,15 +122,19 @@ for i in range(100):
 def start():
     # init value for closest object, later recalculated by min function
     auton = False
-    lastXErr = 0
-    lastDist = 0
     speed = 0.5
 
-    avgX = 0
-    avgY = 0
-    lowPassThreshold = 0.8
-    
-    xIntegral = 0
+    # clear the controllers and filters from the last run
+    xPid.reset()
+    yPid.reset()
+    measurementFilter.reset()
+    outputFilter.reset()
+
+    # start every run with a full frame search
+    tracker.reset()
+
+    # a new telemetry file for every run
+    recorder.start()
 
     # This tells the car to begin at a standstill
     rc.drive.stop()
@@ -94,118 +144,117 @@ def start():
 # 60 frames per second or slower depending on processing speed) until the back button
 
 def update():
-    global auton
+    global auton, filteredResult, filterDt
 
     # when the controller button is pressed, initialize the autonomous sequence
     if rc.controller.was_pressed(rc.controller.Button.A) and not auton:
         auton = True
 
+    xErr, dist = 0, 0
+
    # run full semi-auto sequence 
     if auton:
+        frameSeq = lastFrameSeq
         xErr, dist = find_object()
+        filterDt += rc.get_delta_time()
+
+        # a dist of 0 means no detection, which should not be averaged into the position
+        if dist == 0:
+            measurementFilter.reset()
+            filterDt = 0
+        else:
+            # only a new frame is a new sample, the same one again would drag the derivative to 0
+            if lastFrameSeq != frameSeq:
+                filteredResult = measurementFilter.update((xErr, dist), filterDt)
+                filterDt = 0
+            xErr, dist = filteredResult
+
         # move_to_position(xErr,dist)
 
-def move_to_position(xErr, dist):
-    global lastXErr, lastYErr, speed, avgX, avgY, xIntegral
+    # log this tick instead of printing, there is no drive output or flame sensor here
+    recorder.record(rc.get_delta_time(), xErr, dist, 0, 0, speed, auton, -1)
 
-    # 50 cm offset from object
-    yErr = (dist - 50)
+def move_to_position(xErr, dist):
+    global xPid, yPid, navStage, speed, outputFilter
 
-    canCloseDistance = False
+    dt = rc.get_delta_time()
 
-    kpx = 1 #1
-    kix = 0.01 # 0.05
-    kdx = 0.1 #0.6
+    # close the distance once pointing at the object within alignThreshold degrees
+    stage = 'close' if abs(xErr) <= alignThreshold else 'align'
+    canCloseDistance = stage == 'close'
 
-    kpy = 1 #1
-    kdy = 0.6 #0.6
+    # fresh controllers on every stage change
+    if stage != navStage:
+        xPid.reset()
+        yPid.reset()
+        navStage = stage
 
     # x
-    xIntegral += xErr * rc.get_delta_time()
-
-    if (abs(xErr) > 50):
-        xDeriv = (xErr - lastXErr)/rc.get_delta_time()
-        xOutput = xErr * kpx + kix * xIntegral + xDeriv * kdx
-    else:
-        xDeriv = (xErr - lastXErr)/rc.get_delta_time()
-        xOutput = xErr * kpx + kix * xIntegral + xDeriv * kdx
+    xOutput = xPid.update(xErr, dt)
 
+    if canCloseDistance:
         xOutput *= -0.1
-        canCloseDistance = True
-        xIntegral = 0
+        xPid.reset_integral()
 
-    # y
+    # y, 50 cm offset from object is the setpoint
     if (dist != 0 and canCloseDistance):
-        yDeriv = (yErr - lastYErr)/rc.get_delta_time()
-        yOutput = yErr * kpy + yDeriv * kdy
+        yOutput = yPid.update(dist, dt)
     else:
         yOutput = -1
 
     xOutput = rc_utils.clamp(xOutput, -1, 1)
     yOutput = rc_utils.clamp(yOutput, -1, 1)
 
-    xOutput = low_pass(xOutput, avgX)
-    yOutput = low_pass(yOutput, avgY)
-
-    lastXErr = xErr
-    lastYErr = yErr
+    xOutput, yOutput = outputFilter.update((xOutput, yOutput))
 
     rc.drive.set_speed_angle(yOutput, -xOutput)
 
-def low_pass(avg, val):
-    global lowPassThreshold
-    return (avg * lowPassThreshold) + (val * (1-lowPassThreshold))
-
 def find_object():
-    global capture
+    global captureWorker, tracker, lastFrameSeq, lastResult, cameraModel, targetProfile, detectionMode
     # image = rc.camera.get_color_image()
-    ret, image = capture.read()
-    
-    print(ret)
-    print(image)
+    ret, image, frameTime, frameSeq = captureWorker.read_latest()
 
     if not ret:
-        return 
-    depthImage = rc.camera.get_depth_image()
-    
-    # HSV THRESHOLDING FOR RED CONE
-    # hsvMin = (134,0,0)
-    # hsvMax = (179,255,255)
+        return 0,0
+
+    # the camera stalled, so the newest frame no longer says where the object is
+    if monotonic() - frameTime > maxFrameAge:
+        return 0,0
 
-    # thresholding for deer object (and white people apparently?)
-    hsvMin = (107,0,67)
-    hsvMax = (124,185,207)
+    # no new frame since the last call, nothing to recompute
+    if frameSeq == lastFrameSeq:
+        return lastResult
+    lastFrameSeq = frameSeq
 
-    contours = rc_utils.find_contours(image, hsvMin, hsvMax)
+    # hsv thresholds for the object we are looking for (red cone, deer or candle)
+    hsvMin, hsvMax = vision.HSV_PROFILES[targetProfile]
 
-    largestContour = rc_utils.get_largest_contour(contours)
+    # in 'roi' mode searches around the last detection, or the whole frame if the object was lost
+    largestContour, center = vision.find_target(image, hsvMin, hsvMax, detectionMode, tracker)
 
-    if largestContour is not None:
-        rc_utils.draw_contour(image, largestContour, (0,255,0))
-        center = rc_utils.get_contour_center(largestContour)
+    if center is not None:
+        # 'moments' mode finds the center without a contour
+        if largestContour is not None:
+            rc_utils.draw_contour(image, largestContour, (0,255,0))
     
         # centroid is represented in (y,x) format 
         centroidX = center[1]
-        # print(centroidX)
-        centroidXErr = centroidX - 320
-        # offset = 0
-
-        # if centroidXErr > 0:
-        #     offset = 719 - abs(int(centroidXErr * 0.34))
-        # elif centroidXErr < 0:
-        #     offset = abs(int(centroidXErr * 0.34))
+        centroidXErr = cameraModel.bearing(centroidX)
 
-        # distanceReading = lidarSamples[offset]
+        # the lidar range in the direction of the object (see lidar_range.py)
+        distanceReading = rangeFinder.lookup(rc.lidar.get_samples(), centroidX)
 
-        distanceReading = depthImage[center[0],center[1]]
+        # nothing returned around the object, fall back to the depth pixel at its center
+        if distanceReading == 0:
+            distanceReading = rc.camera.get_depth_image()[center[0],center[1]]
 
-        # print(f'centroidXErr: {centroidXErr}, offset: {offset}, distance: {distanceReading}')
-        print(f'centroidXErr: {centroidXErr}, distance: {distanceReading}')
+        # centroidXErr and distance are in the telemetry log (see telemetry.py)
         
-        return centroidXErr, distanceReading
+        lastResult = (centroidXErr, distanceReading)
+        return lastResult
 
-    print('no object found')
-    return 0,0
+    lastResult = (0,0)
+    return lastResult
 
 def update_slow():
     """
@@ -0,0 +1,106 @@
+"""
+File Name: pid.py
+
+Title: PID controller
+
+Purpose: One PID controller per axis for move_to_position(), instead of module globals for
+the last error and the integral. Guards against the zero and huge delta times update() can
+see, so a slow frame no longer turns into a derivative kick.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import math
+
+########################################################################################
+# PID controller
+########################################################################################
+
+# the error is measurement - setpoint, which matches the xErr and yErr the navigation uses
+# - the derivative is taken on the measurement, so changing the setpoint does not kick the output,
+#   and it is low pass filtered (derivativeFilter=1 turns the filter off)
+# - the integral is clamped so ki * integral stays within integralLimit, and it stops growing
+#   while the output is saturated
+# - a delta time that is zero, negative or not a number skips the integral and derivative update,
+#   one longer than maxDt is clamped to maxDt
+# - when called faster than the measurement changes, newSample=False marks a repeated sample: the
+#   integral still runs, but the derivative waits for the next new sample and then spans the time
+#   since the last one, instead of a spike on the new sample and zero on the repeats
+class PID:
+    __slots__ = ('kp', 'ki', 'kd', 'setpoint', 'outputLimits', 'integralLimit', 'derivativeFilter',
+                 'maxDt', 'integral', 'derivative', 'lastMeasurement', 'sampleDt', 'output')
+
+    def __init__(self, kp, ki=0.0, kd=0.0, setpoint=0.0, outputLimits=(-1, 1), integralLimit=1.0,
+                 derivativeFilter=0.5, maxDt=0.1):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.setpoint = setpoint
+
+        # (min, max) of the output, or None for no limit
+        self.outputLimits = outputLimits
+        # largest contribution (in output units) the integral term may make, or None for no limit
+        self.integralLimit = integralLimit
+        # weight of the newest derivative sample, between 0 (frozen) and 1 (unfiltered)
+        self.derivativeFilter = derivativeFilter
+        self.maxDt = maxDt
+
+        self.reset()
+    # END DEF
+
+    # forgets all state, called when the navigation switches stage
+    def reset(self):
+        self.integral = 0.0
+        self.derivative = 0.0
+        self.lastMeasurement = None
+        # seconds since lastMeasurement was taken
+        self.sampleDt = 0.0
+        self.output = 0.0
+    # END DEF
+
+    def reset_integral(self):
+        self.integral = 0.0
+    # END DEF
+
+    # returns the new output dt seconds after the last call
+    def update(self, measurement, dt, newSample=True):
+        error = measurement - self.setpoint
+
+        validDt = dt > 0 and not math.isnan(dt)
+        if validDt:
+            dt = min(dt, self.maxDt)
+            self.sampleDt = min(self.sampleDt + dt, self.maxDt)
+
+            # derivative on measurement, filtered, skipped on the first sample after a reset
+            if newSample and self.lastMeasurement is not None:
+                rawDerivative = (measurement - self.lastMeasurement) / self.sampleDt
+                self.derivative += self.derivativeFilter * (rawDerivative - self.derivative)
+
+            lastIntegral = self.integral
+            self.integral += error * dt
+
+            if self.integralLimit is not None and self.ki != 0:
+                limit = abs(self.integralLimit / self.ki)
+                self.integral = min(max(self.integral, -limit), limit)
+
+        if newSample:
+            self.lastMeasurement = measurement
+            self.sampleDt = 0.0
+
+        output = self.kp * error + self.ki * self.integral + self.kd * self.derivative
+
+        if self.outputLimits is not None:
+            low, high = self.outputLimits
+
+            # anti windup: do not keep integrating in the direction the output is already saturated
+            if validDt and ((output > high and error * self.ki > 0) or (output < low and error * self.ki < 0)):
+                self.integral = lastIntegral
+                output = self.kp * error + self.ki * self.integral + self.kd * self.derivative
+
+            output = min(max(output, low), high)
+
+        self.output = output
+        return output
+    # END DEF
@@ -0,0 +1,519 @@
+"""
+File Name: racecar_headless.py
+
+Title: Headless racecar backend
+
+Purpose: Runs the start()/update() scripts in this folder off the car and outside the
+simulator. It stands in for racecar_core with the camera, lidar, drive, controller, display
+and servo surfaces the scripts use, swaps the gpiozero pins for gpiozero's mock pins, and
+drives update() as fast as it can on a virtual clock.
+
+The scripts also import racecar_utils from ../library. When that library is not there, a
+minimal stand-in with the contour helpers and clamp() the scripts use is put in its place
+(it needs opencv).
+
+Services in the scripts that run on their own thread (the control loop, the frame watchdog,
+the led display and the elevator motion) are switched to the virtual clock when the script
+loads, and are stepped after every update() instead, so a headless run always plays out the
+same way.
+
+Usage:
+    python3 racecar_headless.py custom-teleop.py --frames 10000
+
+From code:
+    script, rc = racecar_headless.load_script('navigation.py')
+    rc.controller.press(rc.controller.Button.A)
+    rc.run(1000)
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import argparse
+import importlib.util
+import os
+import sys
+import types
+from enum import IntEnum
+from time import perf_counter
+import numpy as np
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# the racecar camera and lidar defaults
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+LIDAR_SAMPLES = 720
+
+# update() rate the virtual clock pretends to run at
+DEFAULT_FRAME_RATE = 60
+
+########################################################################################
+# Synthetic frames
+########################################################################################
+
+# makes a black bgr frame with one filled rectangle centered at (y,x), or an empty frame for None
+def synthetic_frame(center=None, size=(40, 40), color=(220, 220, 220), width=CAMERA_WIDTH, height=CAMERA_HEIGHT):
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+
+    if center is not None:
+        y0 = max(center[0] - size[0] // 2, 0)
+        x0 = max(center[1] - size[1] // 2, 0)
+        frame[y0:y0 + size[0], x0:x0 + size[1]] = color
+
+    return frame
+# END DEF
+
+########################################################################################
+# Racecar surfaces
+########################################################################################
+
+# frames can be a single image, a list that is cycled through, or a function of the frame index
+class HeadlessCamera:
+    def __init__(self, racecar, width=CAMERA_WIDTH, height=CAMERA_HEIGHT):
+        self.racecar = racecar
+        self.width = width
+        self.height = height
+        self.color = synthetic_frame(width=width, height=height)
+        self.depth = np.zeros((height, width), dtype=np.float32)
+    # END DEF
+
+    def pick(self, frames):
+        if callable(frames):
+            return frames(self.racecar.frame)
+        if isinstance(frames, (list, tuple)):
+            return frames[self.racecar.frame % len(frames)]
+        return frames
+    # END DEF
+
+    def get_color_image(self):
+        # the real camera hands out a fresh frame every call, so hand out a copy
+        return self.pick(self.color).copy()
+    # END DEF
+
+    def get_color_image_no_copy(self):
+        return self.pick(self.color)
+    # END DEF
+
+    def get_depth_image(self):
+        return self.pick(self.depth)
+    # END DEF
+
+    def get_width(self):
+        return self.width
+    # END DEF
+
+    def get_height(self):
+        return self.height
+    # END DEF
+
+class HeadlessLidar:
+    def __init__(self, racecar):
+        self.racecar = racecar
+        # distances in cm, 0 means no return
+        self.samples = np.zeros(LIDAR_SAMPLES, dtype=np.float32)
+    # END DEF
+
+    def get_samples(self):
+        if callable(self.samples):
+            return self.samples(self.racecar.frame)
+        return self.samples
+    # END DEF
+
+    def get_num_samples(self):
+        return len(self.get_samples())
+    # END DEF
+
+# remembers the last command so tests can check what the script asked the car to do
+class HeadlessDrive:
+    def __init__(self):
+        self.speed = 0.0
+        self.angle = 0.0
+        self.max_speed = 0.25
+        self.commands = 0
+    # END DEF
+
+    def set_speed_angle(self, speed, angle):
+        self.speed = speed
+        self.angle = angle
+        self.commands += 1
+    # END DEF
+
+    def stop(self):
+        self.set_speed_angle(0, 0)
+    # END DEF
+
+    def set_max_speed(self, max_speed=0.25):
+        self.max_speed = max_speed
+    # END DEF
+
+# scripted controller input: press(), hold(), release(), set_trigger() and set_joystick()
+# take effect on the next update(), a press() lasts exactly one frame
+class HeadlessController:
+    class Button(IntEnum):
+        A = 0
+        B = 1
+        X = 2
+        Y = 3
+        LB = 4
+        RB = 5
+        LJOY = 6
+        RJOY = 7
+        BACK = 8
+        START = 9
+    # END CLASS
+
+    class Trigger(IntEnum):
+        LEFT = 0
+        RIGHT = 1
+    # END CLASS
+
+    class Joystick(IntEnum):
+        LEFT = 0
+        RIGHT = 1
+    # END CLASS
+
+    def __init__(self):
+        self.down = set()
+        self.was_down = set()
+        # buttons held until release(), and buttons pressed for a single frame
+        self.held = set()
+        self.pressed = set()
+        self.triggers = [0.0, 0.0]
+        self.joysticks = [(0.0, 0.0), (0.0, 0.0)]
+    # END DEF
+
+    def press(self, button):
+        self.pressed.add(button)
+    # END DEF
+
+    def hold(self, button):
+        self.held.add(button)
+    # END DEF
+
+    def release(self, button):
+        self.held.discard(button)
+    # END DEF
+
+    def set_trigger(self, trigger, value):
+        self.triggers[trigger] = value
+    # END DEF
+
+    def set_joystick(self, joystick, x, y):
+        self.joysticks[joystick] = (x, y)
+    # END DEF
+
+    # called by the racecar before every update(), applies the scripted input
+    def step(self):
+        self.was_down = self.down
+        self.down = self.held | self.pressed
+        self.pressed = set()
+    # END DEF
+
+    def is_down(self, button):
+        return button in self.down
+    # END DEF
+
+    def was_pressed(self, button):
+        return button in self.down and button not in self.was_down
+    # END DEF
+
+    def was_released(self, button):
+        return button not in self.down and button in self.was_down
+    # END DEF
+
+    def get_trigger(self, trigger):
+        return self.triggers[trigger]
+    # END DEF
+
+    def get_joystick(self, joystick):
+        return self.joysticks[joystick]
+    # END DEF
+
+class HeadlessDisplay:
+    def __init__(self):
+        self.matrix = np.zeros((8, 24), dtype=np.uint8)
+        self.writes = 0
+    # END DEF
+
+    def set_matrix(self, matrix):
+        self.matrix = np.array(matrix, dtype=np.uint8)
+        self.writes += 1
+    # END DEF
+
+    def get_matrix(self):
+        return self.matrix
+    # END DEF
+
+    def show_color_image(self, image):
+        pass
+    # END DEF
+
+    def show_depth_image(self, image, max_depth=1000, points=[]):
+        pass
+    # END DEF
+
+# stands in for rc.servo, the simulator servo that servotest_sim.py drives
+class HeadlessServo:
+    def __init__(self):
+        self.angle = 0.0
+        self.writes = 0
+    # END DEF
+
+    def set_angle(self, angle):
+        self.angle = angle
+        self.writes += 1
+    # END DEF
+
+########################################################################################
+# Racecar
+########################################################################################
+
+# stands in for racecar_core.create_racecar()
+# with a frame rate the clock is virtual and get_delta_time() is always 1 / frameRate, with
+# frameRate=None it is the real time since the last update(), either way nothing sleeps
+class HeadlessRacecar:
+    def __init__(self, frameRate=DEFAULT_FRAME_RATE):
+        self.frameRate = frameRate
+        self.frame = 0
+        self.time = 0.0
+        self.delta_time = 0.0 if frameRate is None else 1 / frameRate
+        self.last_tick = None
+
+        self.camera = HeadlessCamera(self)
+        self.lidar = HeadlessLidar(self)
+        self.drive = HeadlessDrive()
+        self.controller = HeadlessController()
+        self.display = HeadlessDisplay()
+        self.servo = HeadlessServo()
+
+        self.start = None
+        self.update = None
+        self.update_slow = None
+        self.update_slow_time = 1.0
+
+        # optional function(racecar, frame) called before every update() to script input
+        self.script = None
+
+        # services stepped on the virtual clock after every update(), see use_virtual_clock()
+        self.clocked = []
+    # END DEF
+
+    def set_start_update(self, start, update, update_slow=None):
+        self.start = start
+        self.update = update
+        self.update_slow = update_slow
+    # END DEF
+
+    def set_update_slow_time(self, time=1.0):
+        self.update_slow_time = time
+    # END DEF
+
+    def get_delta_time(self):
+        return self.delta_time
+    # END DEF
+
+    # the virtual time in seconds, for services that take a clock
+    def clock(self):
+        return self.time
+    # END DEF
+
+    # runs a service with use_clock() and step(now) on the virtual clock instead of its thread
+    def use_virtual_clock(self, service):
+        service.use_clock(self.clock)
+        self.clocked.append(service)
+    # END DEF
+
+    # advances the clock by one frame
+    def tick(self):
+        if self.frameRate is None:
+            now = perf_counter()
+            self.delta_time = 0.0 if self.last_tick is None else now - self.last_tick
+            self.last_tick = now
+        self.time += self.delta_time
+    # END DEF
+
+    # runs start() once and then update() for the given number of frames
+    # update_slow() runs every update_slow_time seconds of clock time
+    # returns the number of update() calls per second of wall time
+    def run(self, frames, start=True):
+        if start and self.start is not None:
+            self.start()
+
+        nextSlow = self.time + self.update_slow_time
+        started = perf_counter()
+
+        for _ in range(frames):
+            self.tick()
+            if self.script is not None:
+                self.script(self, self.frame)
+            self.controller.step()
+
+            self.update()
+            for service in self.clocked:
+                service.step(self.time)
+
+            if self.update_slow is not None and self.time >= nextSlow:
+                self.update_slow()
+                nextSlow += self.update_slow_time
+
+            self.frame += 1
+
+        elapsed = perf_counter() - started
+        return frames / elapsed if elapsed > 0 else float('inf')
+    # END DEF
+
+    # the real racecar runs until the back button, headless runs a fixed number of frames
+    def go(self, frames=DEFAULT_FRAME_RATE * 60):
+        return self.run(frames)
+    # END DEF
+
+########################################################################################
+# Stand-in racecar_utils
+########################################################################################
+
+def clamp(value, min, max):
+    if value < min:
+        return min
+    if value > max:
+        return max
+    return value
+# END DEF
+
+def find_contours(color_image, hsv_lower, hsv_upper):
+    import cv2 as cv
+
+    hsv = cv.cvtColor(color_image, cv.COLOR_BGR2HSV)
+    mask = cv.inRange(hsv, hsv_lower, hsv_upper)
+    return cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)[0]
+# END DEF
+
+def get_contour_area(contour):
+    import cv2 as cv
+
+    return cv.contourArea(contour)
+# END DEF
+
+def get_largest_contour(contours, min_area=30):
+    if len(contours) == 0:
+        return None
+    largest = max(contours, key=get_contour_area)
+    return largest if get_contour_area(largest) >= min_area else None
+# END DEF
+
+# center of mass in (y,x), like the real racecar_utils
+def get_contour_center(contour):
+    import cv2 as cv
+
+    moments = cv.moments(contour)
+    if moments['m00'] <= 0:
+        return None
+    return round(moments['m01'] / moments['m00']), round(moments['m10'] / moments['m00'])
+# END DEF
+
+def draw_contour(image, contour, color=(0, 255, 0)):
+    import cv2 as cv
+
+    cv.drawContours(image, [contour], 0, color, 3)
+# END DEF
+
+# installs the stand-in as racecar_utils unless the real library can be imported
+def use_utils_stand_in():
+    if 'racecar_utils' in sys.modules or importlib.util.find_spec('racecar_utils') is not None:
+        return
+    # the scripts add ../library to the path themselves
+    if os.path.exists(os.path.join('..', 'library', 'racecar_utils.py')):
+        return
+
+    utils = types.ModuleType('racecar_utils')
+    for function in (clamp, find_contours, get_contour_area, get_largest_contour, get_contour_center, draw_contour):
+        setattr(utils, function.__name__, function)
+    sys.modules['racecar_utils'] = utils
+# END DEF
+
+########################################################################################
+# Loading scripts
+########################################################################################
+
+# makes every gpiozero device created from now on use gpiozero's mock pins
+# the pwm variant is needed for Servo
+def use_mock_pins():
+    from gpiozero import Device
+    from gpiozero.pins.mock import MockFactory, MockPWMPin
+
+    Device.pin_factory = MockFactory(pin_class=MockPWMPin)
+# END DEF
+
+# drives a mock input pin high or low, e.g. the flame sensor on pin 5
+def drive_pin(number, high):
+    from gpiozero import Device
+
+    pin = Device.pin_factory.pin(number)
+    if high:
+        pin.drive_high()
+    else:
+        pin.drive_low()
+# END DEF
+
+# imports one of the scripts in this folder against a headless racecar
+# returns (script module, racecar), the script's start() and update() are ready to run
+def load_script(path, racecar=None, mockPins=True):
+    if racecar is None:
+        racecar = HeadlessRacecar()
+
+    core = types.ModuleType('racecar_core')
+    core.create_racecar = lambda *args, **kwargs: racecar
+    sys.modules['racecar_core'] = core
+    use_utils_stand_in()
+
+    if mockPins:
+        use_mock_pins()
+
+    # file names like custom-teleop.py are not valid module names, so load by path
+    name = os.path.splitext(os.path.basename(path))[0].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+
+    # threaded services the script created move to the virtual clock before start() runs
+    for value in list(vars(script).values()):
+        if callable(getattr(value, 'use_clock', None)) and callable(getattr(value, 'step', None)):
+            racecar.use_virtual_clock(value)
+
+    racecar.set_start_update(script.start, script.update, getattr(script, 'update_slow', None))
+    return script, racecar
+# END DEF
+
+def main():
+    parser = argparse.ArgumentParser(description='run a racecar script headless')
+    parser.add_argument('script', help='script to run, e.g. custom-teleop.py')
+    parser.add_argument('--frames', type=int, default=10000, help='number of update() calls')
+    parser.add_argument('--frame-rate', type=float, default=DEFAULT_FRAME_RATE,
+                        help='virtual frame rate for get_delta_time(), 0 uses the real time between frames')
+    parser.add_argument('--auton', action='store_true', help='press A on the first frame')
+    parser.add_argument('--pin-high', type=int, action='append', default=[],
+                        help='mock pin to drive high, e.g. 5 for no flame on the active low flame sensor')
+    args = parser.parse_args()
+
+    racecar = HeadlessRacecar(args.frame_rate or None)
+    script, racecar = load_script(args.script, racecar)
+
+    for number in args.pin_high:
+        drive_pin(number, True)
+
+    # a target slowly sweeping across the view
+    racecar.camera.color = lambda frame: synthetic_frame((CAMERA_HEIGHT // 2, (frame * 4) % CAMERA_WIDTH))
+
+    if args.auton:
+        racecar.controller.press(racecar.controller.Button.A)
+
+    rate = racecar.run(args.frames)
+    print(f'{args.frames} updates at {rate:.0f} updates per second')
+    return 0
+# END DEF
+
+if __name__ == "__main__":
+    sys.exit(main())
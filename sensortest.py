@@ -29,13 +29,13 @@ Expected Outcome: Terminal output and RACECAR movement occurs when buttons are p
 #racecar sim navigation.py
 
 import sys
-from gpiozero import DigitalInputDevice
 import time
-import numpy as np
 
 sys.path.insert(0, '../library')
 import racecar_core
 import racecar_utils as rc_utils
+import led_font
+import flame_sensor
 
 ########################################################################################
 # Global variables
@@ -44,7 +44,13 @@ import racecar_utils as rc_utils
 rc = racecar_core.create_racecar()
 
 # size of color matrix
-flame_ref = DigitalInputDevice(5)
+flameSensor = flame_sensor.FlameSensor(5)
+
+# seconds FIRE stays up after the sensor last saw the fire
+fireHoldTime = 0.5
+
+# writes frames to the led matrix only when they change (see led_font.py)
+ledWriter = led_font.FrameWriter(rc.display)
 
 # Declare any global variables here
 
@@ -63,74 +69,26 @@ def start():
 # 60 frames per second or slower depending on processing speed) until the back button
 
 def update():
-    global flame_ref
+    global flameSensor
 
-    if (flame_ref.value == 0):
+    if flameSensor.fire_within(fireHoldTime):
         write_fire()
     else:
         no_detection_matrix()
 
 def write_fire():
-    new_matrix = np.zeros((8,24), dtype=np.uint8)
-    
-    new_matrix = f(2, new_matrix)
-    new_matrix = i(3, new_matrix)
-    new_matrix = r(4, new_matrix)
-    new_matrix = e(4, new_matrix)
-
-    rc.display.set_matrix(new_matrix)
-
-def f(offset, matrix):
-    proc_offset = offset - 1
-    for i in range(1,7):    
-        matrix[i, proc_offset] = 1
-    for i in range(1,5):
-        matrix[1, proc_offset+i] = 1
-    for i in range(1,5):
-        matrix[4, proc_offset+i] = 1
-
-    return matrix
-
-def i(offset, matrix):
-    proc_offset = offset + 5
-    matrix[1, proc_offset] = 1
-    for i in range(3,7):
-        matrix[i,proc_offset] = 1
-
-    return matrix
-
-def r(offset, matrix):
-    proc_offset = offset + 7
-    matrix[2, proc_offset+1] = 1
-    for i in range(1,7):
-        matrix[i, proc_offset] = 1 
-    for i in range(0,3):
-        matrix[1,proc_offset+i] = 1 
-    
-    return matrix
-
-def e(offset, matrix):
-    proc_offset = offset + 12
-    for i in range(1,7):
-        matrix[i, proc_offset] = 1
-    for i in range(0,3):
-        matrix[1, proc_offset + i] = 1
-    for i in range(0,3):
-        matrix[4, proc_offset + i] = 1
-    for i in range(0,3):
-        matrix[6, proc_offset + i] = 1
-
-    return matrix
+    global ledWriter
+    ledWriter.write(led_font.render('FIRE', 1))
 
 def detection_matrix():
-    # create a matrix of ones for every single pixel
-    new_matrix = np.ones((8,24), dtype=np.uint8)
-    rc.display.set_matrix(new_matrix)
+    global ledWriter
+    # turn on every single pixel
+    ledWriter.write(led_font.FULL)
 
 def no_detection_matrix():
-    # create a matrix of zeroes for every single pixel
-    new_matrix = np.zeros((8,24), dtype=np.uint8)
-    rc.display.set_matrix(new_matrix)
+    global ledWriter
+    # turn off every single pixel
+    ledWriter.write(led_font.BLANK)
 
 def update_slow():
     """
@@ -152,87 +110,3 @@ def update_slow():
 if __name__ == "__main__":
     rc.set_start_update(start, update, update_slow)
     rc.go()
-
-________________________________________________________________________________________________________________________________________________________
-
-'''
-"""
-Copyright MIT
-MIT License
-bwsix RC101 - Fall 2023
-
-File Name: servotest.py
-
-Title: Demo RACECAR program (servo test)
-
-Purpose: To verify that basic RACECAR functions work properly and that servo simulation works
-in the Unity simulator using the racecar API (no GPIOZero or Raspberry Pi hardware needed).
-
-Expected Outcome:
-- When started, car simulates servo changes through rc.servo.set_angle()
-"""
-
-########################################################################################
-# Imports
-########################################################################################
-
-import sys
-import time
-
-sys.path.insert(0, '../library')
-import racecar_core
-import racecar_utils as rc_utils
-
-########################################################################################
-# Global variables
-########################################################################################
-
-rc = racecar_core.create_racecar()
-
-########################################################################################
-# Functions
-########################################################################################
-
-def start():
-    """
-    This function is run once when the start button is pressed
-    """
-    print(">> Servo test starting...")
-    rc.drive.stop()
-
-def update():
-    """
-    This function is run every frame
-    """
-    # Test servo simulation with angle values
-    print("Setting servo angle to 0.0")
-    rc.servo.set_angle(0.0)
-    time.sleep(1)
-
-    print("Setting servo angle to 0.5")
-    rc.servo.set_angle(0.5)
-    time.sleep(1)
-
-    print("Setting servo angle to 1.0")
-    rc.servo.set_angle(1.0)
-    time.sleep(1)
-
-    # Optionally stop the car after test
-    rc.drive.stop()
-
-def update_slow():
-    """
-    Runs once per second; can be used to poll buttons if desired
-    """
-    if rc.controller.is_down(rc.controller.Button.RB):
-        print("Right bumper pressed")
-
-########################################################################################
-# Main execution
-########################################################################################
-
-if __name__ == "__main__":
-    rc.set_start_update(start, update, update_slow)
-    rc.go()
-
-'''
\ No newline at end of file
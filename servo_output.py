@@ -0,0 +1,106 @@
+"""
+File Name: servo_output.py
+
+Title: Servo output stage
+
+Purpose: Collects the servo positions asked for during an update() tick and writes every
+servo at most once per tick, and only when its position changed. PWM writes are not free on
+the pi, and repeating the same position or dithering back and forth by a hair makes the
+servos jitter, so a change smaller than a threshold that turns back on the last one is
+skipped. A steady motion is written every tick however slow it is, and a channel that comes
+to rest gets its exact final position. A channel without a device (like a fan that is not
+mounted yet) takes positions and ignores them.
+
+    servoOutput = servo_output.ServoOutput()
+    servoOutput.add('left', Servo(6))
+    servoOutput.add('fan', None)
+
+    servoOutput.set('left', 0.4)
+    servoOutput.flush()
+"""
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# smallest change in position (servo range -1 to 1) worth a write
+THRESHOLD = 0.01
+
+########################################################################################
+# Servo output
+########################################################################################
+
+class ServoOutput:
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+
+        # device of every channel by name, None for a channel with nothing connected
+        self.devices = {}
+        # positions asked for since the last flush
+        self.pending = {}
+        # the position last written to every channel
+        self.written = {}
+        # the position asked for at the last flush, to see when a channel has come to rest
+        self.previous = {}
+        # the direction (1 or -1) of the last written change of every channel
+        self.direction = {}
+
+        # how many writes went out and how many were skipped as too small
+        self.writes = 0
+        self.skipped = 0
+    # END DEF
+
+    def add(self, name, device=None):
+        self.devices[name] = device
+    # END DEF
+
+    # asks for a position, only the last one asked for before flush() is written
+    def set(self, name, value):
+        if name not in self.devices:
+            raise KeyError(f'unknown servo channel {name}')
+        self.pending[name] = min(max(value, -1), 1)
+    # END DEF
+
+    # writes every channel that moved by at least the threshold since its last write,
+    # call once at the end of every update()
+    def flush(self):
+        for name, value in self.pending.items():
+            device = self.devices[name]
+            if device is None:
+                continue
+
+            last = self.written.get(name)
+            moving = value != self.previous.get(name)
+            self.previous[name] = value
+
+            if last is not None:
+                step = value - last
+                direction = 1 if step > 0 else -1
+
+                # a small step back against the last change is jitter, a small step onward is a
+                # slow motion, and once the position holds still the final value always goes out
+                jitter = moving and abs(step) < self.threshold and direction != self.direction.get(name)
+                if step == 0 or jitter:
+                    self.skipped += 1
+                    continue
+
+                self.direction[name] = direction
+
+            device.value = value
+            self.written[name] = value
+            self.writes += 1
+
+        self.pending.clear()
+    # END DEF
+
+    # the next flush() writes every channel asked for, e.g. after the servos were detached
+    def invalidate(self):
+        self.written.clear()
+        self.previous.clear()
+        self.direction.clear()
+    # END DEF
+
+    # the position last written to a channel, None if it was never written
+    def position(self, name):
+        return self.written.get(name)
+    # END DEF
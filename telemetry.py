@@ -0,0 +1,167 @@
+"""
+File Name: telemetry.py
+
+Title: Telemetry recorder
+
+Purpose: A near zero cost log of every update() tick, to replace printing every frame.
+Records go into a preallocated ring of numpy segments. Whenever a segment fills up, a
+background thread copies it into a memory mapped file, so update() never waits on the disk.
+If the flush thread falls a whole ring behind, the segments update() has started writing over
+are skipped and counted in dropped, rather than written as a mix of two laps.
+
+Reading a run back:
+    records = telemetry.load_telemetry('telemetry/custom-teleop-20261018-142500.bin')
+    print(records['xErr'], records['dt'])
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import atexit
+import os
+import queue
+import threading
+from time import monotonic, strftime
+import numpy as np
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# one record per update() tick
+DTYPE = np.dtype([
+    ('timestamp', np.float64),
+    ('dt', np.float32),
+    # bearing of the object in degrees, positive to the right
+    ('xErr', np.float32),
+    ('dist', np.float32),
+    ('xOutput', np.float32),
+    ('yOutput', np.float32),
+    ('speed', np.float32),
+    ('auton', np.bool_),
+    # flame_ref.value, or -1 when the script has no flame sensor
+    ('flame', np.int8),
+])
+
+TELEMETRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telemetry')
+
+# records per segment and segments in the ring, 4 x 256 is about four seconds at 60 Hz
+SEGMENT_SIZE = 256
+SEGMENTS = 4
+
+# records the file has room for, 30 minutes at 60 Hz
+FILE_CAPACITY = 60 * 60 * 30
+
+########################################################################################
+# Recorder
+########################################################################################
+
+class TelemetryRecorder:
+    def __init__(self, name, directory=TELEMETRY_DIR, segmentSize=SEGMENT_SIZE, segments=SEGMENTS,
+                 capacity=FILE_CAPACITY):
+        self.name = name
+        self.directory = directory
+        self.segmentSize = segmentSize
+        self.segments = segments
+        self.capacity = capacity
+
+        self.ring = np.zeros(segments * segmentSize, dtype=DTYPE)
+        self.index = 0
+        # number of segments filled so far, the ring slot of segment n is written over again
+        # once segment n + segments is being filled
+        self.filled = 0
+
+        # (ring start, segment number) of full segments waiting for the flush thread
+        self.pending = queue.Queue()
+        # number of segments that were overwritten before the flush thread got to them
+        self.dropped = 0
+        # the flush thread copies a segment out of the ring before checking it is still whole
+        self.scratch = np.zeros(segmentSize, dtype=DTYPE)
+
+        self.file = None
+        self.path = None
+        self.written = 0
+        self.thread = None
+
+        atexit.register(self.close)
+    # END DEF
+
+    # starts a new file for this run, called from start()
+    def start(self):
+        self.close()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f'{self.name}-{strftime("%Y%m%d-%H%M%S")}.bin')
+        self.file = np.memmap(self.path, dtype=DTYPE, mode='w+', shape=(self.capacity,))
+        self.written = 0
+        self.index = 0
+        self.filled = 0
+
+        self.thread = threading.Thread(target=self.run, name='telemetry-flush', daemon=True)
+        self.thread.start()
+    # END DEF
+
+    # stores one tick, this is all update() pays for
+    def record(self, dt, xErr, dist, xOutput, yOutput, speed, auton, flame):
+        self.ring[self.index] = (monotonic(), dt, xErr, dist, xOutput, yOutput, speed, auton, flame)
+        self.index += 1
+
+        # a segment just filled up, hand it to the flush thread
+        if self.index % self.segmentSize == 0:
+            self.pending.put((self.index - self.segmentSize, self.filled))
+            self.filled += 1
+
+            if self.index == len(self.ring):
+                self.index = 0
+    # END DEF
+
+    # flush thread: copies full segments into the file
+    def run(self):
+        while True:
+            segment = self.pending.get()
+            if segment is None:
+                return
+            start, number = segment
+
+            np.copyto(self.scratch, self.ring[start:start + self.segmentSize])
+
+            # record() came all the way around the ring and started on this slot, so the copy
+            # may mix two laps
+            if self.filled - number >= self.segments:
+                self.dropped += 1
+                continue
+
+            self.write(self.scratch)
+    # END DEF
+
+    def write(self, records):
+        if self.file is None:
+            return
+
+        count = min(len(records), self.capacity - self.written)
+        self.file[self.written:self.written + count] = records[:count]
+        self.written += count
+    # END DEF
+
+    # writes what is left in the ring and closes the file
+    def close(self):
+        if self.thread is not None:
+            self.pending.put(None)
+            self.thread.join()
+            self.thread = None
+
+            # the partly filled segment at the end of the run
+            start = self.index - self.index % self.segmentSize
+            self.write(self.ring[start:self.index])
+
+        if self.file is not None:
+            self.file.flush()
+            self.file = None
+    # END DEF
+
+# reads a telemetry file back, leaving out the unused space at the end
+def load_telemetry(path):
+    records = np.memmap(path, dtype=DTYPE, mode='r')
+    return np.array(records[records['timestamp'] > 0])
+# END DEF
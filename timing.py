@@ -0,0 +1,161 @@
+"""
+File Name: timing.py
+
+Title: Update timing
+
+Purpose: Shows where the time in update() goes. Each subsystem is wrapped in a named
+section (a with block or a decorator), and its durations go into a streaming histogram
+with fixed, log spaced bins. Memory and cost per sample stay constant no matter how long
+the car runs. summary() gives count, p50, p99 and max for every section.
+
+    with timing.section('servos'):
+        ...
+
+    @timing.timed('find_object')
+    def find_object():
+        ...
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import functools
+import json
+import math
+from time import perf_counter
+import numpy as np
+
+########################################################################################
+# Streaming histogram
+########################################################################################
+
+# durations from low to high seconds in log spaced bins, anything outside lands in the end bins
+# percentiles are accurate to one bin, about 12% with the default 20 bins per decade
+class StreamingHistogram:
+    def __init__(self, low=1e-6, high=10.0, binsPerDecade=20):
+        self.low = low
+        self.scale = binsPerDecade / math.log(10)
+        self.counts = np.zeros(int(math.log(high / low) * self.scale) + 1, dtype=np.int64)
+        self.reset()
+    # END DEF
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    # END DEF
+
+    def add(self, seconds):
+        if seconds > self.low:
+            index = min(int(math.log(seconds / self.low) * self.scale), len(self.counts) - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    # END DEF
+
+    # upper edge (seconds) of the bin holding the p-th percentile, p between 0 and 100
+    def percentile(self, p):
+        if self.count == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), self.count * p / 100))
+        return min(self.low * math.exp((index + 1) / self.scale), self.max)
+    # END DEF
+
+########################################################################################
+# Sections
+########################################################################################
+
+# every histogram by section name
+histograms = {}
+
+# times the body of a with block, reused for every entry of the same name
+# sections are not thread safe, each name should only be timed from one thread
+class Section:
+    def __init__(self, name):
+        self.histogram = histograms.setdefault(name, StreamingHistogram())
+        self.started = 0.0
+    # END DEF
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+    # END DEF
+
+    def __exit__(self, *exception):
+        self.histogram.add(perf_counter() - self.started)
+        return False
+    # END DEF
+
+sections = {}
+
+# with timing.section(name): times the block under that name
+def section(name):
+    timer = sections.get(name)
+    if timer is None:
+        timer = sections[name] = Section(name)
+    return timer
+# END DEF
+
+# @timing.timed(name): times every call of the decorated function under that name
+def timed(name):
+    def decorate(function):
+        histogram = histograms.setdefault(name, StreamingHistogram())
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add(perf_counter() - started)
+        # END DEF
+
+        return wrapper
+    # END DEF
+    return decorate
+# END DEF
+
+########################################################################################
+# Reporting
+########################################################################################
+
+# {name: {count, mean_ms, p50_ms, p99_ms, max_ms}} for every section
+def stats():
+    result = {}
+    for name, histogram in histograms.items():
+        result[name] = {
+            'count': histogram.count,
+            'mean_ms': histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+            'p50_ms': histogram.percentile(50) * 1000,
+            'p99_ms': histogram.percentile(99) * 1000,
+            'max_ms': histogram.max * 1000,
+        }
+    return result
+# END DEF
+
+# one line per section, slowest p99 first
+def summary():
+    lines = []
+    for name, entry in sorted(stats().items(), key=lambda item: -item[1]['p99_ms']):
+        lines.append(f"{name:<14} {entry['count']:7d} calls  p50 {entry['p50_ms']:7.2f} ms  "
+                     f"p99 {entry['p99_ms']:7.2f} ms  max {entry['max_ms']:7.2f} ms")
+    return '\n'.join(lines)
+# END DEF
+
+# writes stats() to a json file
+def export(path):
+    with open(path, 'w') as file:
+        json.dump(stats(), file, indent=2)
+# END DEF
+
+def reset():
+    for histogram in histograms.values():
+        histogram.reset()
+# END DEF
@@ -0,0 +1,303 @@
+"""
+File Name: tune_pid.py
+
+Title: Offline PID tuner
+
+Purpose: Searches the move_to_position() gains offline instead of by driving into candles.
+Every candidate set of gains drives a simple kinematic model of the rover toward a target,
+using the same align / close staging as move_to_position(). Candidates are ranked by
+settling time, overshoot and actuator effort. All cores are used through a process pool.
+
+Starting positions and frame timing come either from a spread of built in scenarios or from
+recorded traces. A trace is a telemetry .bin file written by telemetry.py, a .csv with an
+xErr,dist,dt header (xErr in degrees), or a .npy array of shape (N, 3) with those columns.
+Traces only seed the model: every stretch of autonomous driving in a recording (the whole
+trace for .csv and .npy) becomes one scenario, starting from its first detection and stepping
+with its recorded frame times. The rest of the recorded xErr and dist is not replayed, it
+came out of the gains that drove that run, and the model produces its own for each candidate.
+
+Usage:
+    python3 tune_pid.py [--traces telemetry/custom-teleop-*.bin run1.csv] [--candidates 2000] [--top 10]
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import pid
+import filters
+import camera_model
+import telemetry
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# half the horizontal fov of the camera in degrees, nothing outside of it is seen
+HALF_FOV = camera_model.FOV / 2
+
+# rover, speeds in cm/s at full throttle after set_max_speed(0.5), steering in radians
+MAX_SPEED = 100.0 * 0.5
+MAX_STEER = math.radians(20)
+WHEELBASE = 32.0
+
+# move_to_position() targets, the same numbers as in custom-teleop.py (degrees and cm)
+TARGET_DISTANCE = 50
+ALIGN_THRESHOLD = 12.5
+
+# settled means within these bounds of the target until the end of the run
+SETTLE_X = 5
+SETTLE_DIST = 10
+
+# how long each run lasts and the frame time of the built in scenarios
+DURATION = 20.0
+FRAME_TIME = 1 / 30
+
+# weights for combining the metrics into one score, lower is better
+OVERSHOOT_WEIGHT = 0.05
+EFFORT_WEIGHT = 1.0
+
+# range searched for every gain: kpx, kix, kdx, kpy, kdy
+GAIN_RANGES = {
+    'kpx': (0.4, 12.0),
+    'kix': (0.0, 0.4),
+    'kdx': (0.0, 4.0),
+    'kpy': (0.1, 3.0),
+    'kdy': (0.0, 1.0),
+}
+
+# the gains move_to_position() uses today, always evaluated for comparison
+CURRENT_GAINS = {'kpx': 3.91, 'kix': 0.039, 'kdx': 0.391, 'kpy': 1, 'kdy': 0.6}
+
+########################################################################################
+# Rover model
+########################################################################################
+
+# (xErr, dist) as find_object() would see it, or (0, 0) when the target is out of view
+def observe(x, y, heading, targetX, targetY):
+    dx = targetX - x
+    dy = targetY - y
+
+    # bearing to the target, positive to the left of the heading
+    bearing = math.atan2(dy, dx) - heading
+    bearing = (bearing + math.pi) % (2 * math.pi) - math.pi
+
+    bearing = math.degrees(bearing)
+    if abs(bearing) >= HALF_FOV:
+        return 0, 0
+
+    # positive xErr means the target is right of center, like CameraModel.bearing()
+    return -bearing, math.hypot(dx, dy)
+# END DEF
+
+# drives the model from a start of (xErr, dist) with the given frame times
+# returns (settling time, overshoot, effort per second) for one run
+def simulate(gains, startXErr, startDist, dts):
+    xPid = pid.PID(kp=gains['kpx'], ki=gains['kix'], kd=gains['kdx'], outputLimits=None)
+    yPid = pid.PID(kp=gains['kpy'], kd=gains['kdy'], setpoint=TARGET_DISTANCE)
+    outputFilter = filters.EmaFilter(alpha=0.2, channels=2)
+    stage = None
+
+    # rover at the origin facing +x, target placed where the start measurement says it is
+    bearing = -math.radians(startXErr)
+    targetX = startDist * math.cos(bearing)
+    targetY = startDist * math.sin(bearing)
+    x = y = heading = 0.0
+
+    settledAt = None
+    time = 0.0
+    overshoot = 0.0
+    effort = 0.0
+    lastCommand = (0.0, 0.0)
+    lastXErr = startXErr
+
+    for dt in dts:
+        xErr, dist = observe(x, y, heading, targetX, targetY)
+
+        # same staging as move_to_position()
+        newStage = 'close' if abs(xErr) <= ALIGN_THRESHOLD else 'align'
+        if newStage != stage:
+            xPid.reset()
+            yPid.reset()
+            stage = newStage
+
+        xOutput = xPid.update(xErr, dt)
+        if stage == 'close':
+            xOutput *= -0.1
+            xPid.reset_integral()
+
+        if dist != 0 and stage == 'close':
+            yOutput = yPid.update(dist, dt)
+        else:
+            yOutput = -1
+
+        xOutput = min(max(xOutput, -1), 1)
+        yOutput = min(max(yOutput, -1), 1)
+        xOutput, yOutput = outputFilter.update((xOutput, yOutput))
+
+        # rc.drive.set_speed_angle(yOutput, -xOutput), a positive angle turns right
+        speed = yOutput * MAX_SPEED
+        steer = -xOutput * MAX_STEER
+
+        heading -= speed * math.tan(steer) / WHEELBASE * dt
+        x += speed * math.cos(heading) * dt
+        y += speed * math.sin(heading) * dt
+        time += dt
+
+        # overshoot is driving closer than the target, or swinging past the center line
+        if dist != 0:
+            overshoot = max(overshoot, TARGET_DISTANCE - dist)
+            if lastXErr * xErr < 0:
+                overshoot = max(overshoot, abs(xErr) * 0.4)
+            lastXErr = xErr
+
+        effort += (abs(yOutput - lastCommand[0]) + abs(xOutput - lastCommand[1])) + (yOutput ** 2 + xOutput ** 2) * dt
+        lastCommand = (yOutput, xOutput)
+
+        settled = dist != 0 and abs(xErr) <= SETTLE_X and abs(dist - TARGET_DISTANCE) <= SETTLE_DIST
+        if settled and settledAt is None:
+            settledAt = time
+        elif not settled:
+            settledAt = None
+
+    # never settled counts as twice the run length
+    settlingTime = settledAt if settledAt is not None else 2 * time
+    return settlingTime, overshoot, effort / time
+# END DEF
+
+########################################################################################
+# Search
+########################################################################################
+
+# runs one set of gains over every scenario, this is what the worker processes execute
+# returns (score, gains, mean settling time, max overshoot, mean effort)
+def evaluate(job):
+    gains, scenarios = job
+
+    results = np.array([simulate(gains, startXErr, startDist, dts) for startXErr, startDist, dts in scenarios])
+    settling = results[:, 0].mean()
+    overshoot = results[:, 1].max()
+    effort = results[:, 2].mean()
+
+    score = settling + OVERSHOOT_WEIGHT * overshoot + EFFORT_WEIGHT * effort
+    return score, gains, settling, overshoot, effort
+# END DEF
+
+# starting points spread over distances and both sides of the view at a fixed frame time
+def builtin_scenarios():
+    dts = np.full(int(DURATION / FRAME_TIME), FRAME_TIME)
+
+    scenarios = []
+    for startDist in (120, 200, 300):
+        for startXErr in (-45, -25, 0, 25, 45):
+            scenarios.append((startXErr, startDist, dts))
+    return scenarios
+# END DEF
+
+# reads a trace file into records with xErr, dist and dt fields, telemetry files also have auton
+def load_trace(path):
+    if path.endswith('.bin'):
+        return telemetry.load_telemetry(path)
+
+    if path.endswith('.npy'):
+        trace = np.load(path)
+        if trace.dtype.names is None:
+            trace = np.rec.fromarrays(trace.T[:3], names='xErr,dist,dt')
+        return trace
+
+    return np.genfromtxt(path, delimiter=',', names=True)
+# END DEF
+
+# scenarios from records like telemetry.load_telemetry() returns, one per stretch of autonomous
+# driving, or one for the whole trace without an auton field
+# each starts from the first detection of its stretch, and its frame times are repeated until
+# they cover a whole run
+def trace_scenarios(records):
+    if 'auton' in records.dtype.names:
+        auton = np.concatenate(([0], records['auton'].astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(auton))
+        stretches = [records[start:end] for start, end in zip(edges[::2], edges[1::2])]
+    else:
+        stretches = [records]
+
+    scenarios = []
+    for stretch in stretches:
+        detected = np.flatnonzero(stretch['dist'] > 0)
+        if len(detected) == 0:
+            continue
+
+        first = detected[0]
+        dts = stretch['dt'][first:].astype(np.float64)
+        dts = dts[dts > 0]
+        if len(dts) == 0:
+            continue
+
+        dts = np.resize(dts, int(DURATION / dts.mean()))
+        scenarios.append((float(stretch['xErr'][first]), float(stretch['dist'][first]), dts))
+    return scenarios
+# END DEF
+
+# random candidates inside GAIN_RANGES, plus the current gains
+def sample_gains(count, seed):
+    generator = np.random.default_rng(seed)
+
+    candidates = [dict(CURRENT_GAINS)]
+    for _ in range(count):
+        candidates.append({name: round(float(generator.uniform(low, high)), 4)
+                           for name, (low, high) in GAIN_RANGES.items()})
+    return candidates
+# END DEF
+
+def main():
+    parser = argparse.ArgumentParser(description='tune the move_to_position() gains offline')
+    parser.add_argument('--traces', nargs='*', default=[],
+                        help='telemetry recordings (.bin) or xErr,dist,dt traces (.csv or .npy)')
+    parser.add_argument('--candidates', type=int, default=2000, help='number of random gain sets to try')
+    parser.add_argument('--top', type=int, default=10, help='number of results to print')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    scenarios = [scenario for path in args.traces for scenario in trace_scenarios(load_trace(path))]
+    if args.traces and not scenarios:
+        print('no detections in the given traces')
+        return 1
+    if not scenarios:
+        scenarios = builtin_scenarios()
+
+    candidates = sample_gains(args.candidates, args.seed)
+    jobs = [(gains, scenarios) for gains in candidates]
+
+    print(f'{len(candidates)} gain sets over {len(scenarios)} scenarios on {args.workers} workers')
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(evaluate, jobs, chunksize=max(1, len(jobs) // (args.workers * 8))))
+
+    current = results[0]
+    results.sort(key=lambda result: result[0])
+
+    shown = results[:args.top]
+    if current not in shown:
+        shown.append(current)
+
+    print(f'{"score":>8} {"settle s":>9} {"overshoot":>10} {"effort":>8}  gains')
+    for score, gains, settling, overshoot, effort in shown:
+        label = '  (current)' if gains is current[1] else ''
+        gainText = ' '.join(f'{name}={value}' for name, value in gains.items())
+        print(f'{score:8.2f} {settling:9.2f} {overshoot:10.1f} {effort:8.1f}  {gainText}{label}')
+
+    best = results[0][1]
+    print('\nbest gains for move_to_position():')
+    print(f"xPid = pid.PID(kp={best['kpx']}, ki={best['kix']}, kd={best['kdx']}, outputLimits=None)")
+    print(f"yPid = pid.PID(kp={best['kpy']}, kd={best['kdy']}, setpoint=50)")
+    return 0
+# END DEF
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+"""
+File Name: vision.py
+
+Title: Shared vision helpers
+
+Purpose: Object seeking code shared by custom-teleop.py and navigation.py. Everything in
+here runs inside update(), so the goal is to keep the per-frame cost as low as possible
+on the Raspberry Pi.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import sys
+import cv2 as cv
+import numpy as np
+
+sys.path.insert(0, '../library')
+import racecar_utils as rc_utils
+
+########################################################################################
+# Global variables
+########################################################################################
+
+# hsv thresholds (hsvMin, hsvMax) for every object we know how to find
+HSV_PROFILES = {
+    'red_cone': ((134,0,0), (179,255,255)),
+    'deer': ((107,0,67), (124,185,207)),
+    'candle': ((0,0,207), (179,255,239)),
+}
+
+# contours smaller than this (pixels) are treated as noise, same default as rc_utils
+MIN_CONTOUR_AREA = 30
+
+# how find_target() searches a frame
+#   'full' - threshold the whole frame
+#   'roi' - threshold only a window around the last detection (RoiTracker)
+#   'downscaled' - threshold a shrunken frame, then refine the center at full resolution
+#   'moments' - take the center straight from the mask's connected components, no contours
+DETECTION_MODES = ('full', 'roi', 'downscaled', 'moments')
+
+# how much 'downscaled' mode shrinks the frame on each axis (2 -> 4x fewer pixels, 4 -> 16x)
+DOWNSCALE_FACTOR = 2
+
+########################################################################################
+# Buffer pool
+########################################################################################
+
+# hands out reusable image buffers so the vision code does not allocate new arrays every frame
+# each named buffer grows to the biggest shape it has been asked for and callers get a view
+# of the exact shape they need, so roi windows of changing size all share one allocation
+class BufferPool:
+    def __init__(self):
+        self.buffers = {}
+    # END DEF
+
+    # returns an uninitialized array of the given shape, reused across calls with the same name
+    def get(self, name, shape, dtype=np.uint8):
+        key = (name, len(shape), np.dtype(dtype))
+        buffer = self.buffers.get(key)
+
+        if buffer is None or any(need > have for need, have in zip(shape, buffer.shape)):
+            if buffer is not None:
+                shape = tuple(max(need, have) for need, have in zip(shape, buffer.shape))
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[key] = buffer
+
+        return buffer[tuple(slice(0, size) for size in shape)]
+    # END DEF
+
+# buffers used by every function in this file
+pool = BufferPool()
+
+# converts the image to hsv and thresholds it, both steps write into pooled buffers
+# the returned mask is only valid until the next call with the same name
+def threshold(image, hsvMin, hsvMax, name='mask'):
+    hsv = pool.get('hsv', image.shape)
+    cv.cvtColor(image, cv.COLOR_BGR2HSV, dst=hsv)
+
+    mask = pool.get(name, image.shape[:2])
+    cv.inRange(hsv, hsvMin, hsvMax, dst=mask)
+    return mask
+# END DEF
+
+########################################################################################
+# Contour search
+########################################################################################
+
+# finds the largest object in the given hsv range
+# the image can be a window of a bigger frame starting at (x0, y0), the contour is returned
+# in the coordinates of that bigger frame, or None if nothing was found
+def find_largest_contour(image, hsvMin, hsvMax, x0=0, y0=0, minArea=MIN_CONTOUR_AREA):
+    # same as rc_utils.find_contours, but without allocating the hsv image and mask
+    mask = threshold(image, hsvMin, hsvMax)
+    contours = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)[0]
+    contour = rc_utils.get_largest_contour(contours, minArea)
+
+    if contour is not None and (x0 or y0):
+        contour = contour + np.array([x0, y0], dtype=contour.dtype)
+    return contour
+# END DEF
+
+# grows an (x, y, w, h) box by padding on every side and clips it to the image
+# returns the window as (x0, y0, x1, y1)
+def pad_box(box, padding, shape):
+    x, y, w, h = box
+    x0 = max(x - padding, 0)
+    y0 = max(y - padding, 0)
+    x1 = min(x + w + padding, shape[1])
+    y1 = min(y + h + padding, shape[0])
+    return x0, y0, x1, y1
+# END DEF
+
+# whether an (x, y, w, h) box reaches an edge of the (x0, y0, x1, y1) window that is not also
+# an edge of the image, i.e. the object may go on outside the window
+def touches_window_edge(box, window, shape):
+    x, y, w, h = box
+    x0, y0, x1, y1 = window
+    return ((x <= x0 and x0 > 0) or (y <= y0 and y0 > 0) or
+            (x + w >= x1 and x1 < shape[1]) or (y + h >= y1 and y1 < shape[0]))
+# END DEF
+
+# finds the largest object on a frame shrunk by scale on each axis
+# if refine is set, the object is searched again at full resolution in a small window around
+# the coarse result, so the center keeps full resolution accuracy
+# the contour is always returned in full resolution coordinates, or None if nothing was found
+def find_downscaled(image, hsvMin, hsvMax, scale=DOWNSCALE_FACTOR, refine=True):
+    height, width = image.shape[:2]
+
+    # nearest neighbour just skips pixels, so no new in-between colors end up in the mask
+    small = pool.get('small', (height // scale, width // scale) + image.shape[2:])
+    cv.resize(image, (width // scale, height // scale), dst=small, interpolation=cv.INTER_NEAREST)
+
+    # the area shrinks by scale squared
+    contour = find_largest_contour(small, hsvMin, hsvMax, minArea=MIN_CONTOUR_AREA / (scale * scale))
+    if contour is None:
+        return None
+
+    contour = contour * scale
+
+    if refine:
+        # pad by a couple of coarse pixels, the coarse edge can be off by up to scale pixels
+        x0, y0, x1, y1 = pad_box(cv.boundingRect(contour), 2 * scale, image.shape)
+        refined = find_largest_contour(image[y0:y1, x0:x1], hsvMin, hsvMax, x0, y0)
+
+        if refined is not None:
+            return refined
+
+    return contour
+# END DEF
+
+# finds the center of the largest blob in the given hsv range without tracing any contours
+# connected component statistics give the area, bounding box and centroid of every blob in a
+# single pass over the mask
+# returns (center, box) with center in (y,x) and box in (x, y, w, h) format, or (None, None)
+def find_centroid(image, hsvMin, hsvMax, minArea=MIN_CONTOUR_AREA):
+    mask = threshold(image, hsvMin, hsvMax)
+
+    labels = pool.get('labels', mask.shape, np.int32)
+    count, labels, stats, centroids = cv.connectedComponentsWithStats(mask, labels=labels, connectivity=8)
+
+    # label 0 is the background
+    if count <= 1:
+        return None, None
+
+    areas = stats[1:, cv.CC_STAT_AREA]
+    largest = int(np.argmax(areas))
+    if areas[largest] < minArea:
+        return None, None
+
+    label = largest + 1
+    centroidX, centroidY = centroids[label]
+    box = tuple(int(value) for value in stats[label, :4])
+
+    return (round(centroidY), round(centroidX)), box
+# END DEF
+
+# finds the largest object in the given hsv range with one of the DETECTION_MODES
+# every mode feeds the tracker, so switching back to 'roi' carries on from the last detection
+# returns (contour, center) in full resolution coordinates, or (None, None) if nothing was found
+# 'moments' mode never traces a contour, so it returns (None, center) on a detection
+def find_target(image, hsvMin, hsvMax, mode, tracker):
+    if mode == 'roi':
+        return tracker.find(image, hsvMin, hsvMax)
+
+    if mode == 'moments':
+        center, box = find_centroid(image, hsvMin, hsvMax)
+
+        if center is None:
+            tracker.reset()
+            return None, None
+        tracker.track_box(center, box)
+        return None, center
+
+    if mode == 'downscaled':
+        contour = find_downscaled(image, hsvMin, hsvMax)
+    else:
+        contour = find_largest_contour(image, hsvMin, hsvMax)
+
+    if contour is None:
+        tracker.reset()
+        return None, None
+    return tracker.track(contour)
+# END DEF
+
+########################################################################################
+# Multi-profile detection
+########################################################################################
+
+# finds the largest object for several hsv profiles at once
+# the frame is converted to hsv a single time and every profile thresholds that same image
+class ColorDetector:
+    def __init__(self, profiles=HSV_PROFILES, minArea=MIN_CONTOUR_AREA):
+        # maps a name to its (hsvMin, hsvMax) thresholds
+        self.profiles = dict(profiles)
+        self.minArea = minArea
+
+        # the mask of every profile from the last call, kept around for debugging
+        self.masks = {}
+    # END DEF
+
+    # returns {name: (contour, center)} for every profile, with (None, None) if nothing was found
+    # centers are in (y,x) format like rc_utils.get_contour_center()
+    def detect(self, image):
+        hsv = pool.get('hsv', image.shape)
+        cv.cvtColor(image, cv.COLOR_BGR2HSV, dst=hsv)
+
+        results = {}
+        for name, (hsvMin, hsvMax) in self.profiles.items():
+            mask = pool.get(f'mask_{name}', image.shape[:2])
+            cv.inRange(hsv, hsvMin, hsvMax, dst=mask)
+            self.masks[name] = mask
+
+            contours = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)[0]
+            contour = rc_utils.get_largest_contour(contours, self.minArea)
+
+            center = None
+            if contour is not None:
+                center = rc_utils.get_contour_center(contour)
+
+            if center is None:
+                results[name] = (None, None)
+            else:
+                results[name] = (contour, center)
+
+        return results
+    # END DEF
+
+########################################################################################
+# ROI tracking
+########################################################################################
+
+# keeps the last detection and only searches a padded window around it on the next frame
+# if the object is not found inside the window for max_misses frames in a row, the tracker
+# forgets the detection and the whole frame is searched again
+class RoiTracker:
+    def __init__(self, padding=40, max_misses=3):
+        # how many pixels to grow the last bounding box by on every side
+        self.padding = padding
+        self.max_misses = max_misses
+
+        # when disabled every call is a full frame search
+        self.enabled = True
+
+        self.reset()
+    # END DEF
+
+    # drops the last detection so the next search covers the whole frame
+    def reset(self):
+        # last get_contour_center() result in (y,x) format
+        self.center = None
+        # last bounding box in (x, y, w, h) format
+        self.box = None
+        self.misses = 0
+    # END DEF
+
+    # returns the (x0, y0, x1, y1) window around the last box, clipped to the image
+    def window(self, shape):
+        return pad_box(self.box, self.padding, shape)
+    # END DEF
+
+    # finds the largest object in the given hsv range
+    # returns (contour, center) in full frame coordinates, or (None, None) if nothing was found
+    def find(self, image, hsvMin, hsvMax):
+        if self.enabled and self.box is not None:
+            x0, y0, x1, y1 = self.window(image.shape)
+
+            # slicing gives a view, so the window is not copied
+            contour = find_largest_contour(image[y0:y1, x0:x1], hsvMin, hsvMax, x0, y0)
+
+            if contour is None:
+                self.misses += 1
+                if self.misses < self.max_misses:
+                    return None, None
+
+                # lost the object for too long, fall back to searching the whole frame
+                self.reset()
+            elif not touches_window_edge(cv.boundingRect(contour), (x0, y0, x1, y1), image.shape):
+                return self.track(contour)
+
+            # otherwise the object moved partly out of the window, and only the part inside was
+            # found, which would pull the center and box toward it, so search the whole frame
+
+        contour = find_largest_contour(image, hsvMin, hsvMax)
+
+        if contour is None:
+            return None, None
+        return self.track(contour)
+    # END DEF
+
+    # stores a detection so the next frame only searches around it
+    def track(self, contour):
+        center = rc_utils.get_contour_center(contour)
+
+        # a degenerate contour has no center of mass, so treat it as a miss
+        if center is None:
+            self.reset()
+            return None, None
+
+        self.track_box(center, cv.boundingRect(contour))
+        return contour, center
+    # END DEF
+
+    # stores a detection that only has a center and (x, y, w, h) box
+    def track_box(self, center, box):
+        self.center = center
+        self.box = box
+        self.misses = 0
+    # END DEF
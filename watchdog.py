@@ -0,0 +1,187 @@
+"""
+File Name: watchdog.py
+
+Title: Frame budget watchdog
+
+Purpose: Keeps the rover safe when the Pi cannot keep up, for example when it is thermally
+throttled. The level follows how long update() takes:
+- NORMAL: everything runs
+- DEGRADED: update() is over its budget on average, optional work (debug drawing, full
+  resolution detection) should be dropped until it recovers, see overBudget
+- FAILSAFE: a single update() ran past the hard limit, the drive is stopped
+
+Separately the watchdog tracks how old the last valid vision measurement is. No measurement
+for too long while one is expected (stale) also stops the drive, but leaves the level alone:
+a target out of view is not a reason to search at lower quality. failsafe is true in either
+case.
+
+A background thread also catches an update() that never returns, like a stalled camera
+read, which update() itself could not notice.
+"""
+
+########################################################################################
+# Imports
+########################################################################################
+
+import threading
+from time import monotonic, sleep
+
+from clocked_service import ClockedService
+
+########################################################################################
+# Global variables
+########################################################################################
+
+NORMAL = 0
+DEGRADED = 1
+FAILSAFE = 2
+
+LEVEL_NAMES = ('normal', 'degraded', 'failsafe')
+
+########################################################################################
+# Watchdog
+########################################################################################
+
+class FrameWatchdog(ClockedService):
+    threadName = 'frame-watchdog'
+
+    def __init__(self, budget=1/30, hardLimit=0.25, maxMeasurementAge=0.5, recoverTicks=30, onFailsafe=None,
+                 clock=monotonic):
+        # seconds update() may take on average before degrading
+        self.budget = budget
+        # seconds a single update() may take before the failsafe
+        self.hardLimit = hardLimit
+        # seconds without a valid measurement before the failsafe, while measurements are expected
+        self.maxMeasurementAge = maxMeasurementAge
+        # good ticks in a row needed to go back to NORMAL from DEGRADED or FAILSAFE
+        self.recoverTicks = recoverTicks
+        # called once whenever the watchdog enters FAILSAFE, e.g. rc.drive.stop
+        self.onFailsafe = onFailsafe
+
+        self.init_clock(clock)
+        self.lock = threading.Lock()
+
+        self.reset()
+    # END DEF
+
+    def reset(self):
+        self.level = NORMAL
+        self.average = 0.0
+        self.goodTicks = 0
+        # whether measurements are expected and the last one is too old
+        self.stale = False
+        self.tickStart = None
+        self.lastMeasurement = self.clock()
+        self.expecting = False
+        self.failsafes = 0
+    # END DEF
+
+    # whether update() takes too long, so the optional work should be dropped
+    @property
+    def overBudget(self):
+        return self.level != NORMAL
+    # END DEF
+
+    # whether the drive has to stay stopped
+    @property
+    def failsafe(self):
+        return self.level == FAILSAFE or self.stale
+    # END DEF
+
+    # call at the start of update()
+    def begin(self):
+        self.tickStart = self.clock()
+    # END DEF
+
+    # call whenever vision produced a valid measurement
+    def measured(self):
+        self.lastMeasurement = self.clock()
+    # END DEF
+
+    def measurement_age(self):
+        return self.clock() - self.lastMeasurement
+    # END DEF
+
+    # call at the end of update(), expectMeasurement is whether vision should be producing
+    # measurements right now (i.e. while navigating autonomously)
+    # returns the new level
+    def end(self, expectMeasurement=False):
+        now = self.clock()
+        duration = now - self.tickStart if self.tickStart is not None else 0.0
+        self.tickStart = None
+
+        # a moving average so a single slow frame does not flip the level
+        self.average += 0.1 * (duration - self.average)
+
+        # measurements only just started being expected, give vision a full window to deliver one
+        if expectMeasurement and not self.expecting:
+            self.lastMeasurement = now
+        self.expecting = expectMeasurement
+
+        stale = expectMeasurement and now - self.lastMeasurement > self.maxMeasurementAge
+        entering = stale and not self.failsafe
+        self.stale = stale
+        if entering:
+            self.failed()
+
+        if duration > self.hardLimit:
+            self.enter(FAILSAFE)
+        elif self.average > self.budget:
+            if self.level == NORMAL:
+                self.level = DEGRADED
+            self.goodTicks = 0
+        elif self.level != NORMAL:
+            # recover only once comfortably under budget, so the level does not flap at the edge
+            if self.average < 0.8 * self.budget:
+                self.goodTicks += 1
+            if self.goodTicks >= self.recoverTicks:
+                self.level = NORMAL
+                self.goodTicks = 0
+
+        return self.level
+    # END DEF
+
+    def enter(self, level):
+        with self.lock:
+            entering = level == FAILSAFE and not self.failsafe
+            self.level = level
+            self.goodTicks = 0
+
+        if entering:
+            self.failed()
+    # END DEF
+
+    # the drive just went into failsafe
+    def failed(self):
+        self.failsafes += 1
+        if self.onFailsafe is not None:
+            self.onFailsafe()
+    # END DEF
+
+    def use_clock(self, clock):
+        super().use_clock(clock)
+        self.lastMeasurement = clock()
+    # END DEF
+
+    # catches an update() that has been running past the hard limit at time now
+    def step(self, now=None):
+        if now is None:
+            now = self.clock()
+
+        tickStart = self.tickStart
+        if tickStart is not None and now - tickStart > self.hardLimit:
+            self.enter(FAILSAFE)
+    # END DEF
+
+    def run(self):
+        while self.running:
+            self.step()
+
+            # check several times per hard limit
+            sleep(self.hardLimit / 4)
+    # END DEF
+
+    def summary(self):
+        return (f'watchdog: {LEVEL_NAMES[self.level]}{", stale" if self.stale else ""}, update avg {self.average * 1000:.1f} ms, '
+                f'measurement age {self.measurement_age():.2f} s, {self.failsafes} failsafes')
+    # END DEF